@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       bench_compositor.py
+Description:    Cadence of the /cmd_vel ticks while large frames are drawn,
+                with the videofeed rendered on the main loop versus composed
+                on a background thread. A new raw frame arrives at every
+                render tick and is scaled into the preview with overlays.
+                Reports the time per render tick on the main loop, the gaps
+                between control ticks and the frames that were shown.
+                Usage: bench_compositor.py [width] [height] [render rate]
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+os.environ.setdefault( 'SDL_VIDEODRIVER', 'dummy' )
+import numpy
+import pygame
+from scheduler import Scheduler, monotonic
+from display import WindowDisplay
+
+LOGO     = os.path.join( os.path.dirname(os.path.abspath(__file__)), '..', 'images', 'logo.png' )
+PREVIEW  = (640, 360)
+RATE     = 30  # Hz of the control loop
+DURATION = 3.0 # seconds per run
+
+
+class Header():
+    def __init__(self, seq):
+        self.frame_id = 'bench'
+        self.seq      = seq
+        self.stamp    = Stamp()
+
+
+class Stamp():
+    secs  = 0
+    nsecs = 0
+
+
+class FakeImage():
+    ''' Stand-in for sensor_msgs/Image '''
+    def __init__(self, seq, data, size):
+        self.header   = Header( seq )
+        self.width, self.height = size
+        self.encoding = 'rgb8'
+        self.step     = self.width * 3
+        self.data     = data
+
+
+def run(compose_worker, size, render_rate):
+    ''' Control and render loop for DURATION seconds, (ms per render tick, control gaps in s, frames shown) '''
+    pygame.init()
+    display = WindowDisplay( (PREVIEW[0], PREVIEW[1] + 100), (0, 0) + PREVIEW, LOGO, size, 1, compose_worker )
+    random  = numpy.random.RandomState( 1 )
+    frames  = [ random.randint(0, 256, size[0] * size[1] * 3).astype(numpy.uint8).tobytes() for i in range(4) ]
+    stamps, render = [], []
+    state   = {'seq': 0, 'shown': 0}
+    def control():
+        stamps.append( monotonic() ) # The publish of /cmd_vel
+    def draw():
+        start = monotonic()
+        state['seq'] += 1
+        image = FakeImage( state['seq'], frames[state['seq'] % len(frames)], size )
+        box   = ( 100 + state['seq'] % 50, 100, 80, 60 )
+        if display.draw( image, [((0, 0, 255), box, 2), ((100, 100, 100), (size[0] // 2 - 50, size[1] // 2 - 40, 100, 80), 1)] ) != None:
+            state['shown'] += 1
+        render.append( monotonic() - start )
+    scheduler = Scheduler()
+    scheduler.add( RATE, control )
+    scheduler.add( render_rate, draw )
+    start = monotonic()
+    scheduler.run( lambda: monotonic() - start > DURATION )
+    pygame.quit()
+    return render, numpy.diff( stamps ), state['shown']
+
+
+def main():
+    size        = ( int(sys.argv[1]) if len(sys.argv) > 1 else 1280, int(sys.argv[2]) if len(sys.argv) > 2 else 720 )
+    render_rate = int( sys.argv[3] ) if len(sys.argv) > 3 else 60
+    print( "frames %dx%d at %d Hz into a %dx%d preview, control at %d Hz" % (size + (render_rate,) + PREVIEW + (RATE,)) )
+    print( "%-12s %14s %14s %14s %14s %8s" % ("render", "draw ms mean", "draw ms max", "gap ms p99", "gap ms max", "shown") )
+    for name, compose_worker in (("main loop", False), ("compositor", True)):
+        render, gaps, shown = run( compose_worker, size, render_rate )
+        print( "%-12s %14.2f %14.2f %14.1f %14.1f %8d" % (name, 1000 * numpy.mean(render), 1000 * numpy.max(render),
+                                                         1000 * numpy.percentile(gaps, 99), 1000 * numpy.max(gaps), shown) )
+    print( "ideal gap: %.1f ms" % (1000.0 / RATE) )
+
+
+if __name__ == '__main__':
+    main()
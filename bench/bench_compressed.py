@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       bench_compressed.py
+Description:    Benchmark of the compressed camera transport. Reports the
+                bytes per frame and the bandwidth at 30 fps of the raw, JPEG
+                and PNG transport, the time to get a frame ready for drawing
+                and the time the UI loop spends per frame with the
+                LazyDecoder. Runs without a display or ROS master.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+import time
+import tempfile
+os.environ.setdefault( 'SDL_VIDEODRIVER', 'dummy' )
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+import pygame
+from framesink import FrameSink
+from compressed import LazyDecoder, decodeFrame
+
+FRAMES = 200
+SIZE   = (640, 360)
+
+
+class Header():
+    def __init__(self, seq):
+        self.seq = seq
+
+
+class FakeImage():
+    ''' Stand-in for sensor_msgs/Image '''
+    def __init__(self, seq, surface):
+        self.header   = Header( seq )
+        self.width, self.height = surface.get_size()
+        self.encoding = 'rgb8'
+        self.step     = self.width * 3
+        self.data     = pygame.image.tostring( surface, 'RGB' )
+
+
+class FakeCompressedImage():
+    ''' Stand-in for sensor_msgs/CompressedImage '''
+    def __init__(self, seq, surface, format):
+        self.header = Header( seq )
+        self.format = format
+        path = os.path.join( tempfile.mkdtemp(), 'frame.' + format )
+        pygame.image.save( surface, path )
+        with open( path, 'rb' ) as f:
+            self.data = f.read()
+        os.remove( path )
+        os.rmdir( os.path.dirname(path) )
+
+
+def scene(seq):
+    ''' Camera-like frame, a gradient with a moving target '''
+    surface = pygame.Surface( SIZE )
+    for y in range( 0, SIZE[1], 4 ):
+        surface.fill( (40 + y // 3, 80, 160 - y // 4), (0, y, SIZE[0], 4) )
+    pygame.draw.circle( surface, (220, 60, 40), (100 + 20 * seq, 180), 40 )
+    return surface
+
+
+def uiTime(messages):
+    ''' Seconds per frame spent in the UI loop with the LazyDecoder, and the frames it decoded '''
+    decoder = LazyDecoder()
+    shown, spent = set(), 0.0
+    for message in messages:
+        decoder.offer( message )
+        start = time.time()
+        frame = decoder.frame()
+        spent += time.time() - start
+        if frame != None:
+            shown.add( frame.header.seq )
+        time.sleep( 1.0 / 30 / 10 ) # Frames arrive faster than they are drawn
+    return spent / len(messages), len(shown)
+
+
+def main():
+    pygame.init()
+    scenes = [ scene(seq) for seq in range(8) ]
+    sink   = FrameSink()
+
+    print( "%-6s %12s %12s %16s %14s %10s" % ("path", "bytes/frame", "MB/s @30fps", "ms/frame ready", "ms/frame UI", "decoded") )
+    raw = [ FakeImage(seq, surface) for seq, surface in enumerate(scenes) ]
+    start = time.time()
+    for i in range( FRAMES ):
+        sink.write( raw[i % len(raw)] )
+    elapsed = (time.time() - start) / FRAMES
+    size = len( raw[0].data )
+    print( "%-6s %12d %12.2f %16.3f %14.3f %10s" % ("raw", size, 30.0 * size / 1e6, 1000 * elapsed, 1000 * elapsed, "-") )
+
+    for format in ('jpeg', 'png'):
+        compressed = [ FakeCompressedImage(seq, surface, format) for seq, surface in enumerate(scenes) ]
+        start = time.time()
+        for i in range( FRAMES ):
+            decodeFrame( compressed[i % len(compressed)] )
+        elapsed = (time.time() - start) / FRAMES
+        size = sum( len(message.data) for message in compressed ) // len(compressed)
+        messages = [ FakeCompressedImage.__new__(FakeCompressedImage) for i in range(FRAMES) ]
+        for i, message in enumerate( messages ): # Every frame a new message, like the subscriber hands them over
+            message.header, message.format, message.data = Header( i ), format, compressed[i % len(compressed)].data
+        ui, decoded = uiTime( messages )
+        print( "%-6s %12d %12.2f %16.3f %14.3f %10s" % (format, size, 30.0 * size / 1e6, 1000 * elapsed, 1000 * ui, "%d/%d" % (decoded, FRAMES)) )
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
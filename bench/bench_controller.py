@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       bench_controller.py
+Description:    Throughput of the autonomous steering. Replays synthetic
+                flights through the bang-bang TrackingController and the
+                PIDController, also with the Kalman estimator, and reports
+                the control ticks per second, the changed commands
+                (publishes in the change mode) and the sign flips of the
+                commands (oscillation).
+                Usage: bench_controller.py [flights] [seconds per flight]
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+import time
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+from controller import TrackingController, PIDController
+from replay import Replay, syntheticFlight
+from kalman import TrackEstimator
+
+
+def summary(commands):
+    ''' Ticks with a non-zero command, changed commands and sign flips of the axes '''
+    moving, changes, flips = 0, 0, 0
+    previous = None
+    for t, command in commands:
+        moving += any( command )
+        if previous != None:
+            changes += command != previous
+            flips   += sum( 1 for new, old in zip(command, previous) if new * old < 0 )
+        previous = command
+    return moving, changes, flips
+
+
+def main():
+    flights  = int( sys.argv[1] ) if len(sys.argv) > 1 else 10
+    duration = float( sys.argv[2] ) if len(sys.argv) > 2 else 60.0
+    messages = syntheticFlight( duration )
+
+    print( "flights: %d of %.0f s, %d messages each" % (flights, duration, len(messages)) )
+    print( "%-10s %10s %14s %10s %12s %10s" % ("controller", "ticks/s", "x real time", "non-zero", "changes/s", "flips/s") )
+    for name, controller, estimator in (("bangbang", lambda: TrackingController(verbose=False), lambda: None),
+                                        ("pid", PIDController, lambda: None),
+                                        ("pid+kalman", PIDController, TrackEstimator)):
+        ticks, moving, changes, flips = 0, 0, 0, 0
+        start = time.time()
+        for flight in range( flights ):
+            commands = Replay( controller(), estimator=estimator() ).run( messages )
+            ticks += len( commands )
+            counts = summary( commands )
+            moving, changes, flips = moving + counts[0], changes + counts[1], flips + counts[2]
+        elapsed = time.time() - start
+        seconds = flights * duration
+        print( "%-10s %10.0f %14.0f %9.1f%% %12.1f %10.2f" % (name, ticks / elapsed, ticks / elapsed / 30, 100.0 * moving / ticks,
+                                                           changes / seconds, flips / seconds) )
+
+
+if __name__ == '__main__':
+    main()
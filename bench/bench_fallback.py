@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       bench_fallback.py
+Description:    Benchmark of the in-process fallback tracker on a synthetic
+                moving target, no camera needed. A textured target moves
+                over a textured background with noise. Reports the time per
+                frame, the frames the target was found in and the error of
+                the box, without re-anchoring and with re-anchoring by a
+                simulated tld_tracker every few frames. Also compares a
+                large target with and without a maximum template size.
+                Usage: bench_fallback.py [frames] [scale] [large target] [max template]
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+import math
+import time
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+import numpy
+from state import Box
+from fallback import TemplateTracker, grayFrame
+
+SIZE   = (640, 360)
+TARGET = (40, 40)
+
+
+class Header():
+    def __init__(self, seq):
+        self.seq = seq
+
+
+class FakeImage():
+    ''' Stand-in for sensor_msgs/Image '''
+    def __init__(self, seq, pixels):
+        self.header   = Header( seq )
+        self.height, self.width = pixels.shape[:2]
+        self.encoding = 'rgb8'
+        self.step     = self.width * 3
+        self.data     = pixels.tobytes()
+
+
+def flight(frames, size=TARGET):
+    ''' Frames of a target of size moving on a figure eight, with the true boxes '''
+    random = numpy.random.RandomState( 1 )
+    background = random.randint( 0, 256, (SIZE[1] // 8, SIZE[0] // 8, 3) ).repeat( 8, 0 ).repeat( 8, 1 ).astype( numpy.uint8 )
+    target = random.randint( 0, 256, (size[1] // 4, size[0] // 4, 3) ).repeat( 4, 0 ).repeat( 4, 1 ).astype( numpy.uint8 )
+    range_x, range_y = min( 200, (SIZE[0] - size[0]) // 2 ), min( 100, (SIZE[1] - size[1]) // 2 )
+    images, boxes = [], []
+    for i in range( frames ):
+        t = i / 30.0
+        x = int( SIZE[0] / 2 + range_x * math.sin(0.8 * t) - size[0] / 2 )
+        y = int( SIZE[1] / 2 + range_y * math.sin(1.6 * t) - size[1] / 2 )
+        pixels = background.copy()
+        pixels[y:y + size[1], x:x + size[0]] = target
+        noise = random.randint( -20, 21, pixels.shape )
+        pixels = numpy.clip( pixels.astype(numpy.int16) + noise, 0, 255 ).astype( numpy.uint8 )
+        images.append( FakeImage(i, pixels) )
+        boxes.append( Box(x, y, size[0], size[1]) )
+    return images, boxes
+
+
+def run(images, boxes, scale, anchor_every, max_template=24):
+    ''' Tracks the flight, re-anchored with the true box every anchor_every frames (0 never) '''
+    tracker = TemplateTracker( scale, max_template=max_template )
+    tracker.seed( grayFrame(images[0], scale), boxes[0] )
+    found, errors, elapsed = 0, [], 0.0
+    for i in range( 1, len(images) ):
+        start = time.time()
+        gray = grayFrame( images[i], scale )
+        if anchor_every and i % anchor_every == 0:
+            tracker.seed( gray, boxes[i] )
+            elapsed += time.time() - start
+            continue
+        box, score = tracker.track( gray )
+        elapsed += time.time() - start
+        if box != None:
+            found += 1
+            errors.append( math.hypot(box.x - boxes[i].x, box.y - boxes[i].y) )
+    return elapsed, found, errors
+
+
+def report(name, frames, elapsed, found, tracked, errors):
+    print( "%-16s %10.3f %7.1f%% %14.1f %12.1f" % (name, 1000 * elapsed / (frames - 1), 100.0 * found / tracked,
+                                                 numpy.mean(errors) if errors else float('nan'), max(errors) if errors else float('nan')) )
+
+
+def main():
+    frames = int( sys.argv[1] ) if len(sys.argv) > 1 else 300
+    scale  = int( sys.argv[2] ) if len(sys.argv) > 2 else 4
+    large  = int( sys.argv[3] ) if len(sys.argv) > 3 else 200
+    max_template = int( sys.argv[4] ) if len(sys.argv) > 4 else 24
+    images, boxes = flight( frames )
+
+    print( "%d frames of %dx%d, target %dx%d, downscaled by %d" % (frames, SIZE[0], SIZE[1], TARGET[0], TARGET[1], scale) )
+    print( "%-16s %10s %8s %14s %12s" % ("anchoring", "ms/frame", "found", "mean error px", "max error px") )
+    for name, anchor_every in (("none", 0), ("tld at 6 Hz", 5), ("tld at 2 Hz", 15)):
+        elapsed, found, errors = run( images, boxes, scale, anchor_every )
+        tracked = frames - 1 - ( (frames - 1) // anchor_every if anchor_every else 0 )
+        report( name, frames, elapsed, found, tracked, errors )
+
+    images, boxes = flight( frames, (large, large) )
+    print( "target %dx%d, tld at 6 Hz" % (large, large) )
+    print( "%-16s %10s %8s %14s %12s" % ("max template", "ms/frame", "found", "mean error px", "max error px") )
+    for name, limit in (("no limit", 0), ("%d px" % max_template, max_template)):
+        elapsed, found, errors = run( images, boxes, scale, 5, limit )
+        report( name, frames, elapsed, found, frames - 1 - (frames - 1) // 5, errors )
+
+
+if __name__ == '__main__':
+    main()
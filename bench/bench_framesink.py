@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       bench_framesink.py
+Description:    Microbenchmark of the camera frame path. Compares the old
+                path (pygame.image.fromstring, blit onto the background,
+                blit onto the screen) with the FrameSink path and reports
+                the time per frame and the surfaces allocated per frame. A
+                frame surface counts as allocated when it isn't the surface
+                of the previous frame, which is kept alive so its id can't
+                be reused. Runs without a display or ROS master.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+import time
+os.environ.setdefault( 'SDL_VIDEODRIVER', 'dummy' )
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+import pygame
+from framesink import FrameSink
+
+FRAMES = 500
+
+
+class Header():
+    def __init__(self, seq):
+        self.seq = seq
+
+
+class FakeImage():
+    ''' Stand-in for sensor_msgs/Image '''
+    def __init__(self, seq, width=640, height=360, encoding='rgb8'):
+        self.header   = Header( seq )
+        self.width    = width
+        self.height   = height
+        self.encoding = encoding
+        self.step     = width * 3
+        self.data     = os.urandom( self.step * height )
+
+
+def oldPath(image, screen, background):
+    ''' Path of the interface before the FrameSink, returns the frame surface '''
+    frame = pygame.image.fromstring( image.data, (image.width, image.height), "RGB" )
+    background.blit( frame, (0, 0) )
+    screen.blit( background, (0, 0) )
+    return frame
+
+
+def newPath(sink):
+    ''' Path through one preallocated FrameSink surface '''
+    def path(image, screen, background):
+        frame = sink.write( image )
+        screen.blit( frame, (0, 0) )
+        return frame
+    return path
+
+
+def run(path, images, screen, background):
+    ''' Seconds and surfaces allocated for all images '''
+    allocations, previous = 0, None
+    start = time.time()
+    for image in images:
+        frame = path( image, screen, background )
+        if frame is not previous:
+            allocations += 1
+        previous = frame
+    return time.time() - start, allocations
+
+
+def main():
+    pygame.init()
+    screen     = pygame.display.set_mode( (640, 460) )
+    background = pygame.Surface( screen.get_size() ).convert()
+    images     = [ FakeImage(seq) for seq in range(8) ]
+    images     = [ images[i % len(images)] for i in range(FRAMES) ]
+
+    print( "%-10s %12s %20s" % ("path", "ms/frame", "allocations/frame") )
+    for name, path in (("old", oldPath), ("framesink", newPath(FrameSink()))):
+        elapsed, allocations = run( path, images, screen, background )
+        print( "%-10s %12.3f %20.3f" % (name, 1000 * elapsed / FRAMES, float(allocations) / FRAMES) )
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       bench_headless.py
+Description:    Startup time and CPU time per tick of the window display
+                versus the headless display. Every tick gets a new camera
+                frame, is drawn with the overlays and polls the input. Without
+                an X display the window uses SDL's dummy video driver, which
+                still decodes and blits but doesn't show anything.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+import time
+if not os.environ.get( 'DISPLAY' ):
+    os.environ.setdefault( 'SDL_VIDEODRIVER', 'dummy' )
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+import pygame
+from display import WindowDisplay, HeadlessDisplay, CommandInput
+
+try:
+    cpu_time = time.process_time
+except AttributeError:
+    cpu_time = time.clock # Python 2: processor time on Linux
+
+TICKS = 300
+LOGO  = os.path.join( os.path.dirname(os.path.abspath(__file__)), '..', 'images', 'logo.png' )
+
+
+class Message(object):
+    def __init__(self, **fields):
+        self.__dict__.update( fields )
+
+
+def frames(count):
+    ''' Camera frames with distinct headers '''
+    data = os.urandom( 640 * 360 * 3 )
+    return [ Message(header=Message(frame_id='', seq=i, stamp=Message(secs=i, nsecs=0)), width=640, height=360,
+                     encoding='rgb8', step=640 * 3, data=data) for i in range(count) ]
+
+
+def measure(create):
+    ''' Startup time of create() and CPU time per tick of the display it returns '''
+    start   = time.time()
+    pygame.init()
+    display = create()
+    startup = time.time() - start
+
+    images   = frames( TICKS )
+    overlays = [ ((0, 0, 255), (100, 100, 40, 40), 2), ((100, 100, 100), (288, 157, 64, 46), 1) ]
+    start = cpu_time()
+    for image in images:
+        display.events()
+        if not display.headless: # The interface doesn't call draw when headless
+            display.draw( image, overlays )
+    tick = (cpu_time() - start) / TICKS
+    pygame.quit()
+    return startup, tick
+
+
+def main():
+    print( "%-10s %12s %14s" % ("display", "startup (ms)", "cpu/tick (ms)") )
+    for name, create in (("window", lambda: WindowDisplay((640, 460), (0, 0, 640, 360), LOGO)),
+                         ("headless", lambda: HeadlessDisplay(CommandInput()))):
+        startup, tick = measure( create )
+        print( "%-10s %12.1f %14.3f" % (name, 1000 * startup, 1000 * tick) )
+    print( "video driver: %s" % os.environ.get('SDL_VIDEODRIVER', 'default') )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       bench_input.py
+Description:    Latency from a key press to the publish of /cmd_vel that
+                follows it. Key commands are put into a CommandInput from
+                another thread at random moments, like the headless input.
+                Compares the keys polled at 30 Hz and published on the next
+                30 Hz control tick, like the interface used to, the keys of
+                the window polled at the input rate and published right
+                away, and the headless input waking the loop.
+                Usage: bench_input.py [presses] [input rate]
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+import time
+import random
+import threading
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+import numpy
+import pygame
+from scheduler import Scheduler, monotonic
+from display import CommandInput
+
+RATE = 30 # Hz of the control and the old event loop
+
+
+def run(presses, poll_rate, react, wake):
+    ''' Latencies in seconds of presses key presses, polled at poll_rate (None: only when woken), published at once with react '''
+    scheduler = Scheduler()
+    input     = CommandInput( (lambda: scheduler.post(pump)) if wake else None )
+    state     = {'value': 0, 'done': False}
+    put, published = {}, {}
+
+    def publish():
+        if state['value'] not in published:
+            published[state['value']] = monotonic()
+    def pump():
+        for event in input.events():
+            if event.type == pygame.KEYDOWN:
+                state['value'] += 1
+        if react:
+            publish()
+    def press():
+        generator = random.Random( 1 )
+        for i in range( 1, presses + 1 ):
+            time.sleep( generator.uniform(0.05, 0.15) )
+            put[i] = monotonic()
+            input.put( 'keydown UP' )
+        time.sleep( 0.1 )
+        state['done'] = True
+
+    scheduler.add( RATE, publish )
+    if poll_rate != None:
+        scheduler.add( poll_rate, pump )
+    thread = threading.Thread( target=press )
+    thread.start()
+    scheduler.run( lambda: state['done'] )
+    thread.join()
+    return numpy.array( [ published[i] - put[i] for i in put if i in published ] )
+
+
+def main():
+    presses    = int( sys.argv[1] ) if len(sys.argv) > 1 else 100
+    input_rate = int( sys.argv[2] ) if len(sys.argv) > 2 else 100
+    print( "%d key presses, control at %d Hz" % (presses, RATE) )
+    print( "%-30s %10s %10s %10s %10s" % ("input", "mean ms", "p50 ms", "p99 ms", "max ms") )
+    for name, poll_rate, react, wake in (("polled %d Hz, next tick" % RATE, RATE, False, False),
+                                         ("polled %d Hz, published at once" % input_rate, input_rate, True, False),
+                                         ("woken, published at once", None, True, True)):
+        latency = 1000 * run( presses, poll_rate, react, wake )
+        print( "%-30s %10.2f %10.2f %10.2f %10.2f" % (name, latency.mean(), numpy.percentile(latency, 50),
+                                                      numpy.percentile(latency, 99), latency.max()) )
+
+
+if __name__ == '__main__':
+    main()
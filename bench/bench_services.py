@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       bench_services.py
+Description:    Shows that /cmd_vel keeps flowing while a service call is in
+                progress. A stand-in for the togglecam service answers after
+                an injected delay. A 30 Hz loop counts its publishes while it
+                calls the service once blocking, like the interface used to,
+                and once through AsyncService.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+import time
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+from scheduler import Scheduler, monotonic
+from services import Worker, AsyncService
+
+RATE     = 30  # Hz of the publishing loop
+DURATION = 3.0 # seconds per run
+DELAY    = 1.0 # seconds the service takes to answer
+TIMEOUT  = 2.0
+
+
+def connect(timeout):
+    ''' Stand-in for waiting on the service and creating its proxy '''
+    def toggle():
+        time.sleep( DELAY )
+    return toggle
+
+
+def publishLoop(call, poll):
+    ''' Publishes at RATE Hz, calls the service after half a second '''
+    stamps  = []
+    start   = monotonic()
+    state   = {'called': False}
+    def tick():
+        now = monotonic()
+        if not state['called'] and now - start > 0.5:
+            state['called'] = True
+            call()
+        poll()
+        stamps.append( monotonic() ) # The publish of /cmd_vel
+    scheduler = Scheduler()
+    scheduler.add( RATE, tick )
+    scheduler.run( lambda: monotonic() - start > DURATION )
+    gaps = [ b - a for a, b in zip(stamps, stamps[1:]) ]
+    return len(stamps), max(gaps)
+
+
+def main():
+    print( "%-10s %10s %14s" % ("call", "publishes", "max gap (ms)") )
+
+    proxy = connect( TIMEOUT )
+    count, gap = publishLoop( proxy, lambda: None )
+    print( "%-10s %10d %14.1f" % ("blocking", count, 1000 * gap) )
+
+    results = []
+    worker  = Worker()
+    service = AsyncService( worker, connect, TIMEOUT )
+    count, gap = publishLoop( lambda: service.call(lambda result, error: results.append(error)), worker.poll )
+    print( "%-10s %10d %14.1f" % ("async", count, 1000 * gap) )
+    print( "async call completed: %s" % (results == [None]) )
+    print( "expected publishes: %d" % int(RATE * DURATION) )
+
+
+if __name__ == '__main__':
+    main()
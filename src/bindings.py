@@ -0,0 +1,149 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       bindings.py
+Description:    Table-driven key bindings. Keys are bound to named actions
+                per flightmode (see modes.py): the common table holds the
+                keys of every mode and the table of a mode is an overlay
+                on top of it, which can add, rebind or unbind (empty
+                action) keys. The bindings are resolved once into a
+                dictionary per mode, so an event costs a single lookup.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import copy
+import pygame
+import yaml
+from modes import MODES
+
+# Key names are those of the pygame key constants without the K_ prefix
+# The movement keys take over from the autonomous flightmode, see Interface.__move
+DEFAULT_BINDINGS = {
+    'common': {
+        'UP':     'forward',
+        'DOWN':   'backward',
+        'LEFT':   'left',
+        'RIGHT':  'right',
+        'w':      'up',
+        's':      'down',
+        'a':      'yaw_left',
+        'd':      'yaw_right',
+        'c':      'toggle_camera',
+        'r':      'reset',
+        'e':      'emergency',
+        '1':      'center_box_small',
+        '2':      'center_box_medium_small',
+        '3':      'center_box_medium',
+        '4':      'center_box_medium_big',
+        '5':      'center_box_smaller',
+        '6':      'center_box_bigger',
+        '7':      'center_box_narrower',
+        '8':      'center_box_wider',
+        '9':      'center_box_lower',
+        '0':      'center_box_higher',
+        'RETURN': 'send_target',
+        't':      'reset_tracker',
+        'b':      'battery',
+        'f':      'camera_stats',
+        'l':      'latency',
+        'p':      'profile',
+        'MINUS':  'slower',
+        'EQUALS': 'faster',
+        'SPACE':  'takeoff_land',
+        'TAB':    'next_drone',
+    },
+    'manual': {
+        'm':      'autonomous_flightmode',
+    },
+    'autonomous': {
+        'm':      'manual_flightmode',
+    },
+    'lost_target': {
+        'm':      'manual_flightmode',
+    },
+    'emergency': { # Only the emergency key leaves it, r too so the drone and the mode can't get out of step
+        'r':      'emergency',
+        'UP':     '',
+        'DOWN':   '',
+        'LEFT':   '',
+        'RIGHT':  '',
+        'w':      '',
+        's':      '',
+        'a':      '',
+        'd':      '',
+        'SPACE':  '',
+    },
+}
+
+
+def keyCode(name):
+    ''' pygame key constant of a key name, e.g. "UP" or "a" '''
+    code = getattr( pygame, 'K_' + str(name), None )
+    if code == None:
+        raise ValueError( "Unknown key: %s" % name )
+    return code
+
+
+def keyName(key, mode):
+    ''' Key name of a key of mode read from YAML, which reads 1 as a number and yes, no, on, off, ... as booleans '''
+    if isinstance( key, bool ):
+        raise ValueError( "Key %s in %s was read as a boolean, quote it, e.g. 'y': reset" % (key, mode) )
+    return str( key )
+
+
+def mergeBindings(bindings, overrides):
+    ''' Copy of bindings with the keys of overrides, {mode: {key: action}}, replaced, raises ValueError for boolean keys '''
+    merged = copy.deepcopy( bindings )
+    for mode, keys in (overrides or {}).items():
+        merged.setdefault( mode, {} ).update( (keyName(key, mode), action) for key, action in keys.items() )
+    return merged
+
+
+def loadBindings(path):
+    ''' Overrides in a YAML file, in the layout of DEFAULT_BINDINGS '''
+    with open( path ) as f:
+        return yaml.safe_load( f ) or {}
+
+
+class KeyDispatcher():
+    ''' Calls the actions bound to keys in the current mode
+
+    actions maps an action name to a (press, release) pair of callables,
+    release is None for actions that only act on a press. Keys are pygame key
+    constants, other inputs like a gamepad can call press and release with
+    their own codes once they are in the tables.
+    '''
+
+    def __init__(self, actions, bindings=DEFAULT_BINDINGS, modes=MODES):
+        ''' Constructor, raises ValueError for unknown keys and actions '''
+        self.tables = {}
+        for mode in modes:
+            names = dict( bindings.get('common', {}) )
+            names.update( bindings.get(mode, {}) )
+            table = {}
+            for key, action in names.items():
+                if not action: # Unbound by the overlay of the mode
+                    continue
+                if action not in actions:
+                    raise ValueError( "Unknown action: %s" % action )
+                table[keyCode(key)] = actions[action]
+            self.tables[mode] = table
+
+    def press(self, mode, key):
+        ''' Runs the action of a pressed key, returns whether it's bound '''
+        handlers = self.tables[mode].get( key )
+        if handlers == None:
+            return False
+        handlers[0]()
+        return True
+
+    def release(self, mode, key):
+        ''' Ends the action of a released key, returns whether it's bound '''
+        handlers = self.tables[mode].get( key )
+        if handlers == None:
+            return False
+        if handlers[1] != None:
+            handlers[1]()
+        return True
@@ -0,0 +1,88 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       camera.py
+Description:    Subscription to the camera feed of the AR.Drone. Only the
+                active camera is subscribed, with a queue of one frame and a
+                receive buffer that fits whole frames, so a frame that is
+                superseded before it's handled is dropped by rospy. Frames
+                older than a maximum age can be dropped as well, by the
+                stamp of the driver, which needs synchronized clocks when
+                the driver runs on another host. Counts received, dropped and
+                displayed frames. The raw or the compressed transport of
+                the camera topics can be used, below the namespace of the
+                AR.Drone.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import rospy
+from sensor_msgs.msg import Image, CompressedImage
+from scheduler import monotonic
+
+TOPICS = { 'front': '/ardrone/front/image_raw', 'bottom': '/ardrone/bottom/image_raw' }
+
+
+class CameraFeed():
+    ''' Subscription to the active camera of the AR.Drone '''
+
+    def __init__(self, callback, active='front', max_age=0.0, buff_size=2**24, compressed=False, namespace='', enabled=True):
+        ''' Constructor, callback gets the frames that aren't dropped, max_age in seconds (0 keeps all), compared to the stamp of the driver.
+            With compressed the frames are sensor_msgs/CompressedImage messages, namespace is put in front of the TOPICS.
+            Without enabled nothing is subscribed, only the active camera is followed '''
+        self.callback   = callback
+        self.compressed = compressed
+        self.namespace  = namespace
+        self.max_age    = max_age
+        self.buff_size  = buff_size
+        self.enabled    = enabled
+        self.subscriber = None
+
+        # Counters
+        self.received   = 0
+        self.dropped    = 0
+        self.displayed  = 0
+        self.fps        = 0.0 # Displayed frames per second
+        self.fps_start  = monotonic()
+        self.fps_frames = 0
+
+        self.subscribe( active )
+
+    def subscribe(self, camera):
+        ''' Switches the subscription to camera, 'front' or 'bottom' '''
+        if self.subscriber != None:
+            self.subscriber.unregister()
+        self.active     = camera
+        if not self.enabled: # Nothing uses the frames
+            self.subscriber = None
+            return
+        if self.compressed:
+            topic, message = self.namespace + TOPICS[camera] + '/compressed', CompressedImage
+        else:
+            topic, message = self.namespace + TOPICS[camera], Image
+        self.subscriber = rospy.Subscriber( topic, message, self.__callback, callback_args=camera, queue_size=1, buff_size=self.buff_size )
+
+    def toggle(self):
+        ''' Follows the AR.Drone switching to its other camera '''
+        self.subscribe( 'bottom' if self.active == 'front' else 'front' )
+
+    def shown(self):
+        ''' Counts a frame that was displayed, to be called from the UI loop '''
+        self.displayed  += 1
+        self.fps_frames += 1
+        now = monotonic()
+        if now - self.fps_start >= 1.0:
+            self.fps        = self.fps_frames / (now - self.fps_start)
+            self.fps_start  = now
+            self.fps_frames = 0
+
+    def __callback(self, image, camera):
+        self.received += 1
+        if camera != self.active: # Still in flight from the previous subscription
+            self.dropped += 1
+            return
+        if self.max_age > 0 and not image.header.stamp.is_zero() and (rospy.Time.now() - image.header.stamp).to_sec() > self.max_age:
+            self.dropped += 1
+            return
+        self.callback( image )
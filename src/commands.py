@@ -0,0 +1,91 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       commands.py
+Description:    Collects the velocity commands that are computed during one
+                control tick and publishes them as a single command, so the
+                AR.Drone never sees the intermediate states of a tick. Also
+                holds the change-only publisher of the manual flightmode.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+from collections import namedtuple
+from scheduler import monotonic
+
+AXES = ('linear_x', 'linear_y', 'linear_z', 'angular_z')
+
+# Velocity command for the four axes the AR.Drone listens to
+Command = namedtuple( 'Command', AXES )
+
+
+class CommandAggregator():
+    ''' Aggregates axis updates and publishes one Command per tick '''
+
+    def __init__(self, publish=None):
+        ''' Constructor, publish (if given) is called with the Command of every tick '''
+        self.publish = publish
+        self.values  = dict.fromkeys( AXES, 0.0 )
+        self.pulses  = {} # axis -> [value, remaining ticks, waiting for next tick]
+
+    def reset(self, command=None):
+        ''' Forgets the pending pulses and starts from command (or zero) '''
+        self.values = dict( zip(AXES, command or (0.0,) * len(AXES)) )
+        self.pulses = {}
+
+    def set(self, axis, value):
+        ''' Sets the value of axis for this and the following ticks '''
+        self.values[axis] = value
+
+    def stop(self):
+        ''' Sets all axes to zero and drops the pending pulses '''
+        self.reset()
+
+    def pulse(self, axis, value, ticks=1):
+        ''' Overrides axis with value for the next ticks, starting at the next one '''
+        self.pulses[axis] = [value, ticks, True]
+
+    def flush(self):
+        ''' Publishes the command of this tick, with the active pulses applied '''
+        values = dict( self.values )
+        for axis, pulse in list( self.pulses.items() ):
+            value, ticks, scheduled = pulse
+            if scheduled: # Starts at the next tick
+                pulse[2] = False
+                continue
+            values[axis] = value
+            if ticks <= 1:
+                del self.pulses[axis]
+            else:
+                pulse[1] = ticks - 1
+        command = Command( **values )
+        if self.publish != None:
+            self.publish( command )
+        return command
+
+
+class DeadbandPublisher():
+    ''' Publishes a command only when it changed, plus a low rate keepalive '''
+
+    def __init__(self, publish, deadband=0.0, keepalive_rate=2.0):
+        ''' Constructor, axis changes up to deadband are not considered a change '''
+        self.publish   = publish
+        self.deadband  = deadband
+        self.keepalive = 1.0 / keepalive_rate
+        self.last      = None # Last published command
+        self.last_time = None
+
+    def __call__(self, command):
+        ''' Publishes command if it changed or the keepalive is due, returns whether it did '''
+        now = monotonic()
+        if self.last != None and now - self.last_time < self.keepalive:
+            for new, old in zip( command, self.last ):
+                if abs(new - old) > self.deadband:
+                    break
+            else:
+                return False
+        self.publish( command )
+        self.last      = command
+        self.last_time = now
+        return True
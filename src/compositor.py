@@ -0,0 +1,122 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       compositor.py
+Description:    Composes the videofeed on a background thread. A Renderer
+                converts, scales and draws the overlays of the latest frame
+                onto an offscreen canvas, which is copied into one of three
+                preallocated surfaces (triple buffering). The main loop
+                only hands over frames and swaps in and blits the last
+                finished surface, so a slow frame never delays /cmd_vel.
+                The surface of a DecodedFrame is only drawn under its lock,
+                the UI loop takes it as well to read the selected frame.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import threading
+import pygame
+from renderer import Renderer, frameId
+
+
+class Compositor():
+    ''' Renders the frames of one region of the screen on a background thread
+
+    Has the draw and toFrame of a Renderer. The worker only touches the
+    canvas and the back surface, the main loop only the front surface and
+    the screen, so no surface is used by both threads at once. The frame
+    itself is drawn under its lock, if it has one.
+    '''
+
+    def __init__(self, screen, video_rect, frame_size=None):
+        ''' Constructor, video_rect is the part of the screen showing the feed of frame_size frames, starts the thread '''
+        self.screen     = screen
+        self.video_rect = pygame.Rect( video_rect )
+        size            = self.video_rect.size
+        self.canvas     = pygame.Surface( size, 0, screen )
+        self.renderer   = Renderer( self.canvas, (0, 0) + size, frame_size, self.__drawn )
+        self.changed    = False # The canvas was drawn on by the last job
+
+        # Triple buffer, the worker writes back and swaps it with ready, the main loop swaps ready with front
+        self.back       = pygame.Surface( size, 0, screen )
+        self.ready      = pygame.Surface( size, 0, screen )
+        self.front      = pygame.Surface( size, 0, screen )
+        self.back_id    = None # Frame id on each surface
+        self.ready_id   = None
+        self.front_id   = None
+        self.fresh      = False # ready holds a surface that wasn't shown yet
+        self.lock       = threading.Lock()
+
+        self.submitted  = None # (frame id, overlays) of the last job
+        self.shown_id   = None # Frame id of the surface on screen
+        self.job        = None # (image, overlays) not yet composed
+        self.composed   = 0
+        self.replaced   = 0 # Jobs replaced by a newer one before they were composed
+        self.condition  = threading.Condition()
+        self.thread     = threading.Thread( target=self.__loop, name='compositor' )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def draw(self, image, overlays):
+        ''' Hands image with the given overlays in frame coordinates to the worker and shows the last finished surface.
+            Returns the frame id of a frame that is shown for the first time, None otherwise '''
+        job = ( frameId(image), overlays )
+        if job != self.submitted: # Nothing is composed again when nothing changed
+            self.submitted = job
+            with self.condition:
+                if self.job != None:
+                    self.replaced += 1
+                self.job = ( image, overlays )
+                self.condition.notify()
+        return self.present()
+
+    def present(self):
+        ''' Blits the last finished surface to the screen, returns its frame id if that frame is new on screen '''
+        with self.lock:
+            if not self.fresh:
+                return None
+            self.front, self.ready       = self.ready, self.front
+            self.front_id, self.ready_id = self.ready_id, self.front_id
+            self.fresh = False
+        self.screen.blit( self.front, self.video_rect )
+        pygame.display.update( self.video_rect )
+        if self.front_id == self.shown_id:
+            return None
+        self.shown_id = self.front_id
+        return self.shown_id
+
+    def toFrame(self, pos):
+        ''' Frame coordinates of a position on the screen '''
+        return self.renderer.toFrame( (pos[0] - self.video_rect.x, pos[1] - self.video_rect.y) )
+
+    def __drawn(self, rects):
+        self.changed = True
+
+    def __loop(self):
+        while True:
+            with self.condition:
+                while self.job == None:
+                    self.condition.wait()
+                image, overlays = self.job
+                self.job = None
+            self.changed = False
+            lock = getattr( image, 'lock', None ) # Of a DecodedFrame
+            try:
+                if lock != None:
+                    with lock:
+                        self.renderer.draw( image, overlays ) # Converts and scales new frames only
+                else:
+                    self.renderer.draw( image, overlays )
+            except Exception as e:
+                print( "Composing the videofeed failed: %s" % e )
+                continue
+            if not self.changed:
+                continue
+            self.back.blit( self.canvas, (0, 0) )
+            self.back_id = self.renderer.frame_id
+            with self.lock:
+                self.back, self.ready       = self.ready, self.back
+                self.back_id, self.ready_id = self.ready_id, self.back_id
+                self.fresh = True
+            self.composed += 1
@@ -0,0 +1,72 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       compressed.py
+Description:    Lazy decoding of sensor_msgs/CompressedImage frames (JPEG or
+                PNG). The camera callback only keeps the latest compressed
+                frame. It is decoded on a worker thread when the UI loop is
+                about to draw, so frames that are never shown are never
+                decoded and the event loop doesn't wait for the decoder.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import io
+import threading
+import pygame
+from services import Worker
+
+
+class DecodedFrame():
+    ''' Decoded camera frame, drawn by the Renderer like a raw sensor_msgs/Image
+
+    A surface that is read is locked and can't be blitted, so lock is held
+    by every thread that reads the surface while another thread may draw it.
+    '''
+    __slots__ = ('header', 'width', 'height', 'surface', 'lock')
+
+    def __init__(self, header, surface):
+        self.header  = header
+        self.surface = surface
+        self.width, self.height = surface.get_size()
+        self.lock    = threading.Lock()
+
+
+def decodeFrame(compressed):
+    ''' Decodes a sensor_msgs/CompressedImage into a DecodedFrame '''
+    hint = 'frame.png' if 'png' in compressed.format.lower() else 'frame.jpg'
+    return DecodedFrame( compressed.header, pygame.image.load(io.BytesIO(compressed.data), hint) )
+
+
+class LazyDecoder():
+    ''' Decodes the latest offered frame on request, on its own worker '''
+
+    def __init__(self):
+        ''' Constructor, starts the worker '''
+        self.worker    = Worker( 'decoder' )
+        self.offered   = None # Latest compressed frame
+        self.submitted = None # Compressed frame being or last decoded
+        self.decoded   = None # Latest DecodedFrame
+        self.busy      = False
+
+    def offer(self, compressed):
+        ''' Keeps compressed as the latest frame, called from the camera callback '''
+        self.offered = compressed
+
+    def frame(self):
+        ''' Latest DecodedFrame (or None), starts decoding a newer frame if there is one '''
+        self.worker.poll()
+        offered = self.offered
+        if not self.busy and offered is not None and offered is not self.submitted:
+            self.busy      = True
+            self.submitted = offered
+            self.worker.submit( lambda: decodeFrame(offered), self.__decoded )
+        return self.decoded
+
+    def __decoded(self, frame, error):
+        self.busy = False
+        if error != None:
+            print( "Decoding frame failed: %s" % error )
+            return
+        self.decoded = frame
@@ -0,0 +1,299 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       controller.py
+Description:    Steering of the autonomous flightmode, separated from pygame
+                and rospy. step() turns one snapshot of the callback data
+                into one Command, so the controller can also be driven by
+                recorded or synthetic data, see replay.py. The original
+                bang-bang steering and a PID steering are available.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import math
+import numpy
+from commands import CommandAggregator, Command, AXES
+from pid import VectorPID
+
+# Default gains of the PIDController, per axis in the order of commands.AXES
+PID_KP             = (0.5, 0.3, 0.5, 1.0)
+PID_KI             = (0.05, 0.02, 0.05, 0.1)
+PID_KD             = (0.1, 0.05, 0.1, 0.2)
+PID_INTEGRAL_LIMIT = (1.0, 1.0, 1.0, 1.0)
+
+
+class TrackingController():
+    ''' Steers the AR.Drone so the tracked object stays in the center_box '''
+
+    def __init__(self, no_track_timeout=1.0, correction_ticks=3, verbose=True):
+        ''' Constructor, verbose prints the steering decisions '''
+        self.no_track_timeout = no_track_timeout # seconds without a box before stopping
+        self.correction_ticks = correction_ticks # control ticks a correction pulse lasts
+        self.verbose          = verbose
+        self.commands         = CommandAggregator()
+        self.start( 0.0, None )
+
+    def start(self, now, tracker, command=None):
+        ''' Starts tracking at time now, continuing from command (or zero) '''
+        self.firstTime = True
+        self.lost = False # No box for longer than no_track_timeout
+        self.control_seq = None if tracker == None else tracker.seq # Only steer on boxes that arrive from now on
+        self.goLeft = False
+        self.strafeLeft = False
+        self.strafeRight = False
+        self.goRight = False
+        self.goBackward = False
+        self.goForward = False
+        self.goUp = False
+        self.goDown = False
+        self.startTime = now
+        self.Left_timer = 0
+        self.Right_timer = 0
+        self.commands.reset( command )
+
+    def stop(self):
+        ''' Stops the AR.Drone, returns the Command to publish '''
+        self.commands.stop()
+        return self.commands.flush()
+
+    def step(self, now, snapshot, center_box, speed, frame_size=(640, 360)):
+        ''' One control tick at time now (seconds), returns the Command to publish, sets lost when the target is lost '''
+        self.__steer( now, snapshot, center_box, speed, frame_size )
+        return self.commands.flush()
+
+    def __say(self, message):
+        if self.verbose:
+            print( message )
+
+    def __steer(self, now, snapshot, center_box, speed, frame_size):
+        ''' Computes the commands of this tick, boxes are in frame coordinates of frame_size '''
+        offset = 20				# in te stellen voor elevator-as
+        tracker = snapshot.tracker
+
+        # Only when tracking node publishes a new box
+        if tracker == None or tracker.seq == self.control_seq:
+            # Fallback if object is lost longer than no_track_timeout seconds
+            if not self.firstTime and now - self.startTime > self.no_track_timeout:
+                self.__say( "no Track for %d seconds" % int(now - self.startTime) )
+                self.commands.stop()
+                self.lost = True
+            return
+        self.control_seq = tracker.seq
+        self.lost = False
+        self.startTime = now
+        box, imu, navdata = tracker.box, snapshot.imu, snapshot.navdata
+
+        if self.firstTime:
+            self.init_width = box.width
+            self.init_height = box.height
+            self.firstTime = False
+            self.start_altitude = navdata.altitude
+            self.heading_at_start = imu.orientation_compass
+
+        self.center_tracking_box_x = box.x + (box.width / 2)
+        self.center_tracking_box_y = box.y + (box.height / 2)
+
+        # # A factor from 0 - 1 for being not centered. Used for PID controller (P proportional)
+        half_width, half_height = frame_size[0] / 2.0, frame_size[1] / 2.0
+        self.factor_x = abs(self.center_tracking_box_x - half_width) / half_width
+        self.factor_y = abs(self.center_tracking_box_y - half_height) / half_height
+        #print "factor X:" , self.factor_x , "factor Y:" , self.factor_y
+
+        ## Main steering signals
+
+        #testing code with compass
+        '''print "heading" , self.heading_at_start
+        if self.heading_at_start < 0:
+            # right side of scale
+            if self.orientation_compass < self.heading_at_start:
+                print "turn Left"
+                self.goLeft = True
+                self.integral_factor = self.orientation_x
+                self.parameters.angular.z = 2 * self.speed * self.factor_x * self.integral_factor
+                self.publisher_parameters.publish( self.parameters )
+            elif self.orientation_compass > self.heading_at_start:
+                print "turn Right"
+                self.goRight = True
+                self.integral_factor = self.orientation_x
+                self.parameters.angular.z = 2 * -self.speed * self.factor_x * self.integral_factor
+                self.publisher_parameters.publish( self.parameters )
+        elif self.heading_at_start > 0:
+            # left side of scale
+            if self.orientation_compass < self.heading_at_start:
+                print "turn Right"
+                self.goRight = True
+                self.integral_factor = self.orientation_x
+                self.parameters.angular.z = 2 * -self.speed * self.factor_x * self.integral_factor
+                self.publisher_parameters.publish( self.parameters )
+            elif self.orientation_compass > self.heading_at_start:
+                print "turn Left"
+                self.goLeft = True
+                self.integral_factor = self.orientation_x
+                self.parameters.angular.z = 2 * self.speed * self.factor_x * self.integral_factor
+                self.publisher_parameters.publish( self.parameters )
+        else:
+            self.parameters.angular.z = 0
+            self.publisher_parameters.publish( self.parameters ) '''
+
+        # testing code (steering commands for Roll)
+        if self.Left_timer > 3:
+            self.__say( "strafe Left" )
+            self.strafeLeft = True
+            self.Left_timer = 0
+            self.integral_factor = imu.orientation_x
+            self.commands.set( 'linear_y', speed * self.factor_x * self.integral_factor )
+        elif self.Right_timer > 3:
+            self.__say( "strafe Right" )
+            self.strafeRight = True
+            self.Right_timer = 0
+            self.integral_factor = imu.orientation_x
+            self.commands.set( 'linear_y', -speed * self.factor_x * self.integral_factor )
+        else:
+            self.commands.set( 'linear_y', 0 )
+
+        # Basic steering commands Yaw
+        if self.center_tracking_box_x < center_box.x:
+            self.__say( "turn Left" )
+            self.goLeft = True
+            self.Left_timer += 1
+            self.commands.set( 'angular_z', 2 * speed * self.factor_x )
+        elif self.center_tracking_box_x > (center_box.x + center_box.width):
+            self.__say( "turn Right" )
+            self.goRight = True
+            self.Right_timer += 1
+            self.commands.set( 'angular_z', 2 * -speed * self.factor_x )
+        else:
+            self.commands.set( 'angular_z', 0 )
+
+        # Basic steering commands Pitch
+        if self.center_tracking_box_y < center_box.y:
+            self.__say( "go Forward" )
+            self.goForward = True
+            self.integral_factor = imu.orientation_y
+            self.commands.set( 'linear_x', 0.5 * speed * self.factor_y * self.integral_factor )
+        elif self.center_tracking_box_y > (center_box.y + center_box.height):
+            self.__say( "go Backward" )
+            self.goBackward = True
+            self.integral_factor = imu.orientation_y
+            self.commands.set( 'linear_y', - speed * self.factor_x * self.integral_factor )
+        else:
+            self.commands.set( 'linear_x', 0 )
+
+        # Basic steering commands elevator
+        if (box.width + offset) < self.init_width or (box.height + offset) < self.init_height:
+            self.__say( "go Up" )
+            self.goUp = True
+            self.commands.set( 'linear_z', speed  * tracker.confidence )
+        elif (box.width - offset) > self.init_width or (box.height - offset) > self.init_height:
+            self.__say( "go Down" )
+            self.goDown = True
+            self.commands.set( 'linear_z', -speed * tracker.confidence )
+        else:
+            self.commands.set( 'linear_z', 0 )
+
+        ## Correction if x-location object is in the center_box
+        if self.center_tracking_box_x > center_box.x and self.center_tracking_box_x < (center_box.x + center_box.width):
+            # Correction roll and yaw axe
+            if self.strafeLeft:
+                self.__say( "Correct Right" )
+                self.strafeLeft = False
+                self.commands.pulse( 'linear_y', -0.3, self.correction_ticks )
+            if self.strafeRight:
+                self.__say( "Correct Left" )
+                self.strafeRight = False
+                self.commands.pulse( 'linear_y', 0.3, self.correction_ticks )
+            self.commands.set( 'linear_y', 0 )
+            self.commands.set( 'angular_z', 0 )
+
+        ## Correction if x-location object is in the center_box
+        if self.center_tracking_box_y > center_box.y and self.center_tracking_box_y < (center_box.y + center_box.height):
+            # Correction pitch axe
+            if self.goForward:
+                self.__say( "correct Backward" )
+                self.goForward = False
+                self.commands.pulse( 'linear_x', -0.3, self.correction_ticks )
+            if self.goBackward:
+                self.__say( "correct Forward" )
+                self.goBackward = False
+                self.commands.pulse( 'linear_x', 0.3, self.correction_ticks )
+            self.commands.set( 'linear_x', 0 )
+
+        # Correction altitude compared to starting altitude
+        if navdata.altitude < self.start_altitude - 75:
+            self.__say( "to Low, correcting myself" )
+            self.commands.set( 'linear_z', speed )
+        elif navdata.altitude > self.start_altitude + 75:
+            self.__say( "to High, correcting myself" )
+            self.commands.set( 'linear_z', -speed )
+
+
+class PIDController():
+    ''' Steers the AR.Drone with a VectorPID towards the center of the center_box
+
+    The errors are the offsets of the tracked box from the center of the
+    center_box, in halves of the frame size: horizontal for yaw and strafe,
+    vertical for pitch. The elevator error is the change of the box size
+    since the first box, weighted by the confidence of the tracker. A new box
+    updates the PID, the ticks in between repeat its command.
+    '''
+
+    # Largest command per axis in multiples of the speed, as in the bang-bang steering
+    LIMITS = (0.5, 1.0, 1.0, 2.0)
+
+    def __init__(self, kp=PID_KP, ki=PID_KI, kd=PID_KD, integral_limit=PID_INTEGRAL_LIMIT, no_track_timeout=1.0):
+        ''' Constructor, gains per axis in the order of commands.AXES '''
+        self.pid              = VectorPID( kp, ki, kd, integral_limit )
+        self.no_track_timeout = no_track_timeout # seconds without a box before stopping
+        self.limits           = numpy.array( self.LIMITS )
+        self.limit            = numpy.zeros( len(AXES) )
+        self.error            = numpy.zeros( len(AXES) )
+        self.start( 0.0, None )
+
+    def setGains(self, kp, ki, kd, integral_limit=None):
+        ''' Replaces the gains, e.g. when they are tuned in flight '''
+        self.pid.setGains( kp, ki, kd, integral_limit )
+
+    def start(self, now, tracker, command=None):
+        ''' Starts tracking at time now, continuing from command (or zero) until the first new box '''
+        self.control_seq = None if tracker == None else tracker.seq # Only steer on boxes that arrive from now on
+        self.box_time    = None # Time of the last box
+        self.init_size   = None
+        self.lost        = False
+        self.command     = Command( *(command or (0.0,) * len(AXES)) )
+        self.pid.reset()
+
+    def stop(self):
+        ''' Stops the AR.Drone, returns the Command to publish '''
+        self.pid.reset()
+        self.command = Command( *(0.0,) * len(AXES) )
+        return self.command
+
+    def step(self, now, snapshot, center_box, speed, frame_size=(640, 360)):
+        ''' One control tick at time now (seconds), returns the Command to publish, sets lost when the target is lost '''
+        tracker = snapshot.tracker
+        if tracker == None or tracker.seq == self.control_seq:
+            if self.box_time != None and not self.lost and now - self.box_time > self.no_track_timeout:
+                self.lost = True
+                self.stop()
+            return self.command
+        self.control_seq = tracker.seq
+        dt = 0.0 if self.box_time == None else now - self.box_time
+        self.box_time, self.lost = now, False
+
+        box = tracker.box
+        size = math.sqrt( box.width * box.height )
+        if self.init_size == None:
+            self.init_size = size or 1.0
+        half_width, half_height = frame_size[0] / 2.0, frame_size[1] / 2.0
+        offset_x = (center_box.x + center_box.width / 2.0 - (box.x + box.width / 2.0)) / half_width
+        offset_y = (center_box.y + center_box.height / 2.0 - (box.y + box.height / 2.0)) / half_height
+        self.error[0] = offset_y # Object above the center_box, go forward
+        self.error[1] = offset_x # Object left of the center_box, strafe left
+        self.error[2] = tracker.confidence * (self.init_size - size) / self.init_size # Smaller object, go up
+        self.error[3] = offset_x # and yaw left
+
+        numpy.multiply( self.limits, speed, out=self.limit )
+        self.command = Command( *self.pid.update(self.error, dt, self.limit).tolist() )
+        return self.command
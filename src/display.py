@@ -0,0 +1,195 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       display.py
+Description:    Display backends of the interface. WindowDisplay shows the
+                camera feed in a pygame window and takes the keyboard and
+                mouse as input. The feeds of several AR.Drones are tiled in
+                a grid on the one window, each rendered on the main loop or
+                composed on a background thread. HeadlessDisplay doesn't set up a display,
+                draws nothing and takes key commands from a local socket or
+                a ROS topic, for running on a companion computer.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import math
+import socket
+import threading
+import pygame
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+from renderer import Renderer, frameId
+from compositor import Compositor
+
+
+def tileGrid(count):
+    ''' Columns and rows of the grid of count tiles, as square as possible '''
+    columns = int( math.ceil(math.sqrt(count)) )
+    return columns, int( math.ceil(count / float(columns)) )
+
+
+class WindowDisplay():
+    ''' pygame window with the videofeeds on top and the logo below '''
+    headless = False
+
+    def __init__(self, resolution, video_rect, logo_path, frame_size=None, tiles=1, compose_worker=False):
+        ''' Constructor, sets up the main screen, video_rect shows a preview of frame_size frames.
+            With more tiles it's split into a grid of tileGrid(tiles), tile 0 at the top left.
+            With compose_worker the tiles are composed on background threads, see compositor.py '''
+        self.screen = pygame.display.set_mode( resolution )
+        pygame.display.set_caption( 'NLR: AR.Drone Keyboard Interface' )
+
+        # Setup the background
+        self.background = pygame.Surface( self.screen.get_size() )
+        self.background = self.background.convert()
+        self.background.fill( (255, 255, 255) )
+
+        # Setup logo
+        self.logo           = pygame.image.load( logo_path ).convert()
+        self.logo_rect      = self.logo.get_rect()
+        self.logo_rect.left = 0
+        self.logo_rect.top  = video_rect[3]
+
+        self.background.blit( self.logo, self.logo_rect )
+        self.screen.blit( self.background, (0,0) )
+        pygame.display.flip()
+        self.renderers = []
+        columns, rows  = tileGrid( tiles )
+        width, height  = video_rect[2] // columns, video_rect[3] // rows
+        for tile in range( tiles ):
+            row, column = divmod( tile, columns )
+            rect = ( video_rect[0] + column * width, video_rect[1] + row * height, width, height )
+            self.renderers.append( Compositor(self.screen, rect, frame_size) if compose_worker else Renderer(self.screen, rect, frame_size) )
+        self.font = None # Of the status lines, loaded when first shown
+
+    def draw(self, image, overlays, tile=0):
+        ''' Draws image with the overlays, in frame coordinates, on tile.
+            Returns the frame id of a frame that is shown for the first time, None otherwise '''
+        renderer = self.renderers[tile]
+        if isinstance( renderer, Compositor ): # Shows the last composed frame, which may be an earlier one
+            return renderer.draw( image, overlays )
+        return frameId( image ) if renderer.draw( image, overlays ) else None
+
+    def tileAt(self, pos):
+        ''' Tile at a mouse position, None outside of the videofeeds '''
+        for tile, renderer in enumerate( self.renderers ):
+            if renderer.video_rect.collidepoint( pos ):
+                return tile
+        return None
+
+    def toFrame(self, pos, tile=0):
+        ''' Frame coordinates of a mouse position, in the frames of tile '''
+        return self.renderers[tile].toFrame( pos )
+
+    def events(self):
+        ''' pygame events since the last call '''
+        return pygame.event.get()
+
+    def status(self, lines):
+        ''' Shows lines of text next to the logo, no lines clears it '''
+        if self.font == None:
+            self.font = pygame.font.Font( None, 18 )
+        area = pygame.Rect( self.logo_rect.right, self.logo_rect.top, self.screen.get_width() - self.logo_rect.right, self.logo_rect.height )
+        self.screen.blit( self.background, area, area )
+        for i, line in enumerate( lines ):
+            self.screen.blit( self.font.render(line, True, (0, 0, 0)), (area.left + 5, area.top + 5 + 16 * i) )
+        pygame.display.update( area )
+
+
+class HeadlessDisplay():
+    ''' No display at all, the input comes from a CommandInput '''
+    headless = True
+
+    def __init__(self, input):
+        ''' Constructor, input is the CommandInput to take events from '''
+        self.input = input
+
+    def draw(self, image, overlays, tile=0):
+        ''' Nothing to draw '''
+        return None
+
+    def events(self):
+        ''' Events of the commands received since the last call '''
+        return self.input.events()
+
+    def status(self, lines):
+        ''' Nothing to show, the same numbers are on /diagnostics '''
+        pass
+
+    def tileAt(self, pos):
+        ''' There are no tiles, the keys go to the selected drone '''
+        return None
+
+    def toFrame(self, pos, tile=0):
+        ''' There is no preview, positions are in frame coordinates '''
+        return pos
+
+
+class CommandInput():
+    ''' Turns text commands into pygame events
+
+    A command is "keydown <key>", "keyup <key>", "key <key>" (down and up)
+    or "quit", where <key> is the name of a pygame key constant without the
+    K_ prefix, e.g. "key space" or "keydown UP".
+    '''
+
+    def __init__(self, notify=None):
+        ''' Constructor, commands can be put from any thread, notify() is called from that thread after every event '''
+        self.queue  = queue.Queue()
+        self.notify = notify
+
+    def put(self, command):
+        ''' Queues a text command, malformed commands are reported and dropped '''
+        words = command.split()
+        if words == ['quit']:
+            self.__put( pygame.event.Event(pygame.QUIT) )
+            return
+        if len(words) != 2 or words[0] not in ('keydown', 'keyup', 'key'):
+            print( "Unknown input command: %s" % command )
+            return
+        key = getattr( pygame, 'K_' + words[1], None )
+        if key == None:
+            print( "Unknown key: %s" % words[1] )
+            return
+        if words[0] in ('keydown', 'key'):
+            self.__put( pygame.event.Event(pygame.KEYDOWN, key=key) )
+        if words[0] in ('keyup', 'key'):
+            self.__put( pygame.event.Event(pygame.KEYUP, key=key) )
+
+    def events(self):
+        ''' Events queued since the last call '''
+        events = []
+        while True:
+            try:
+                events.append( self.queue.get_nowait() )
+            except queue.Empty:
+                return events
+
+    def __put(self, event):
+        self.queue.put( event )
+        if self.notify != None:
+            self.notify()
+
+
+class SocketInput(CommandInput):
+    ''' CommandInput reading one command per UDP datagram on a local port '''
+
+    def __init__(self, port, host='127.0.0.1', notify=None):
+        ''' Constructor, starts listening '''
+        CommandInput.__init__( self, notify )
+        self.socket = socket.socket( socket.AF_INET, socket.SOCK_DGRAM )
+        self.socket.bind( (host, port) )
+        self.thread = threading.Thread( target=self.__listen, name='input' )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __listen(self):
+        while True:
+            data = self.socket.recv( 1024 )
+            for line in data.decode( 'ascii', 'replace' ).splitlines():
+                if line.strip():
+                    self.put( line )
@@ -0,0 +1,383 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       drone.py
+Description:    One AR.Drone of the interface: its publishers, subscriptions,
+                latest data, flightmode and steering. All its topics are
+                below a namespace, e.g. /drone1/cmd_vel and
+                /drone1/ardrone/navdata, so one interface flies a fleet. An
+                empty namespace uses the topics of a single AR.Drone. The
+                Interface holds the display and the keys and services the
+                control tick of every Drone from its one scheduler.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import rospy
+import std_srvs.srv
+from std_msgs.msg import Empty, String
+from geometry_msgs.msg import Twist
+from sensor_msgs.msg import Imu
+from tld_msgs.msg import BoundingBox, Target
+from ardrone_autonomy.msg import Navdata
+from scheduler import monotonic
+from commands import Command, DeadbandPublisher
+from services import Worker, AsyncService
+from state import StateStore, trackerState, navdataState
+from imu import ImuRing
+from recorder import FlightRecorder
+from kalman import TrackEstimator
+from fallback import FallbackTracker
+from controller import TrackingController, PIDController, PID_KP, PID_KI, PID_KD, PID_INTEGRAL_LIMIT
+from camera import CameraFeed
+from compressed import LazyDecoder
+from target import TargetPublisher
+from latency import LatencyMonitor
+from renderer import frameId
+from modes import ModeMachine, MANUAL, AUTONOMOUS, LOST_TARGET, EMERGENCY
+
+
+def readGains():
+    ''' kp, ki, kd and integral limit of the PIDController, per axis, blocks on the parameter server '''
+    return ( rospy.get_param('~pid_kp', list(PID_KP)), rospy.get_param('~pid_ki', list(PID_KI)),
+             rospy.get_param('~pid_kd', list(PID_KD)), rospy.get_param('~pid_integral_limit', list(PID_INTEGRAL_LIMIT)) )
+
+
+def droneName(namespace):
+    ''' Name of the drone with topics below namespace '''
+    return namespace.strip( '/' ) or 'ardrone'
+
+
+def recordPath(path, namespace):
+    ''' Path of the recording of the drone below namespace, its name is put in front of the extension of path '''
+    name = droneName( namespace ).replace( '/', '_' )
+    dot  = path.rfind( '.' )
+    if dot <= path.rfind( '/' ):
+        return path + '.' + name
+    return path[:dot] + '.' + name + path[dot:]
+
+
+class Drone():
+    ''' Topics, data and flightmode of one AR.Drone
+
+    The settings are the private parameters of the node, the same for every
+    Drone. Everything but the callbacks is called from the main loop.
+    '''
+
+    def __init__(self, namespace, video_size, record='', shown=True):
+        ''' Constructor, subscribes to the topics below namespace, video_size is the frame size before the first frame.
+            record is the path of a flight recording, empty for none. Without shown the camera feed is only
+            subscribed when the fallback tracker or the recording of frames uses it '''
+        self.namespace  = namespace.rstrip( '/' )
+        self.name       = droneName( self.namespace )
+        self.prefix     = '[%s] ' % self.name if self.namespace else '' # Of the printed messages
+        self.video_size = video_size
+
+        # Latest data of the ROS callbacks, has to be in front of the subscriptions
+        self.imu   = ImuRing( rospy.get_param('~imu_ring_size', 64), rospy.get_param('~imu_window', 16),
+                              rospy.get_param('~imu_filter', 'lowpass'), rospy.get_param('~imu_alpha', 0.3) )
+        self.state = StateStore( self.imu )
+
+        # Flight recorder, fed by the callbacks and the /cmd_vel publisher
+        self.recorder = None
+        if record:
+            self.recorder = FlightRecorder( record, rospy.get_param('~record_capacity', 1000000),
+                                            rospy.get_param('~record_frames', False), rospy.get_param('~record_frame_chunk', 100),
+                                            rospy.get_param('~record_frame_chunks', 10) )
+
+        # Latency of this drone's camera and tracker
+        self.latency = LatencyMonitor( rospy.get_param('~latency_window', 1024) )
+
+        # Variables
+        self.airborne   = False
+        self.image      = None
+        self.frozen     = False # The frame isn't replaced while a box is selected in it
+        self.old_seq    = None
+        self.parameters = Twist()
+        self.held       = {} # (vector, axis) -> value of the movement keys that are held
+
+        # ROS Settings
+        self.publisher_land          = rospy.Publisher( self.topic('/ardrone/land'),     Empty )
+        self.publisher_takeOff       = rospy.Publisher( self.topic('/ardrone/takeoff'),  Empty )
+        self.publisher_reset         = rospy.Publisher( self.topic('/ardrone/reset'),    Empty )
+        self.publisher_parameters    = rospy.Publisher( self.topic('/cmd_vel'),          Twist )
+        self.publisher_tracking_box  = rospy.Publisher( self.topic('/tld_gui_bb'),       Target )
+        self.publisher_reset_tracker = rospy.Publisher( self.topic('/tld_gui_cmds'),     String )
+        self.target_publisher        = TargetPublisher( self.publisher_tracking_box, rospy.get_param('~target_payload', 'full'),
+                                                        rospy.get_param('~target_margin', 0.5) )
+        self.decoder                 = LazyDecoder() if rospy.get_param( '~transport', 'raw' ) == 'compressed' else None
+        frames_used                  = shown or rospy.get_param( '~fallback_tracker', False ) or \
+                                       ( self.recorder != None and self.recorder.frames and self.decoder == None )
+        if not frames_used:
+            print( self.prefix + "Nothing shows or uses the camera feed, it isn't subscribed" )
+        self.camera                  = CameraFeed( self.__callback_camera, rospy.get_param('~camera', 'front'),
+                                                   rospy.get_param('~max_frame_age', 0.0), rospy.get_param('~camera_buff_size', 2**24),
+                                                   self.decoder != None, self.namespace, frames_used )
+        self.subscriber_navdata      = rospy.Subscriber( self.topic('/ardrone/navdata'),   Navdata,     self.__callback_navdata )
+        self.subscriber_imu          = rospy.Subscriber( self.topic('/ardrone/imu'),       Imu,         self.__callback_imu )
+        self.subscriber_tracker      = rospy.Subscriber( self.topic('/tld_tracked_object'), BoundingBox, self.__callback_tracker )
+
+        # Steering of the autonomous flightmode
+        if rospy.get_param( '~controller', 'bangbang' ) == 'pid':
+            self.controller = PIDController( *readGains(), no_track_timeout=rospy.get_param('~no_track_timeout', 1.0) )
+        else:
+            self.controller = TrackingController( rospy.get_param('~no_track_timeout', 1.0), rospy.get_param('~correction_ticks', 3) )
+        self.estimator = None # Predicts the box between tracker updates
+        if rospy.get_param( '~estimator', 'none' ) == 'kalman':
+            if not isinstance( self.controller, PIDController ): # The bang-bang steering would count every prediction as a new box
+                print( "%sThe kalman estimator needs the pid controller, steering on the boxes of the tracker" % self.prefix )
+            else:
+                self.estimator = TrackEstimator( rospy.get_param('~predict_horizon', 0.5), rospy.get_param('~kalman_process_noise', 4e4),
+                                                 rospy.get_param('~kalman_measurement_noise', 25.0) )
+
+        # Publishing of the manual flightmode, every tick or only on change
+        if rospy.get_param( '~publish_mode', 'always' ) == 'change':
+            self.manual_publish = DeadbandPublisher( self.publishCommand, rospy.get_param('~deadband', 0.0), rospy.get_param('~keepalive_rate', 2.0) )
+        else:
+            self.manual_publish = self.publishCommand
+
+        # Service calls run on a worker of this drone, a call that hangs on one driver doesn't hold up the others
+        self.worker            = Worker( 'services' + (' ' + self.name if self.namespace else '') )
+        self.service_togglecam = AsyncService( self.worker, self.__connectToggleCam, rospy.get_param('~service_timeout', 2.0) )
+
+        # In-process tracker bridging the gaps between the boxes of tld_tracker
+        self.fallback       = None
+        self.fallback_after = rospy.get_param( '~fallback_after', 0.2 ) # Seconds without a box of tld_tracker
+        self.tld_time       = None # Time of the last box of tld_tracker
+        if rospy.get_param( '~fallback_tracker', False ):
+            self.fallback   = FallbackTracker( self.__callback_fallback, rospy.get_param('~fallback_scale', 4),
+                                               rospy.get_param('~fallback_search', 1.0), rospy.get_param('~fallback_min_score', 0.5),
+                                               rospy.get_param('~fallback_max_template', 24) )
+
+        # Flightmode, a switch takes effect on the next control tick
+        self.modes = ModeMachine( {MANUAL: self.__enterManual, AUTONOMOUS: self.__enterAutonomous,
+                                   LOST_TARGET: self.__enterLostTarget, EMERGENCY: self.__enterEmergency} )
+
+    def topic(self, name):
+        ''' Name of a topic of this drone '''
+        return self.namespace + name
+
+    def close(self):
+        ''' Closes the flight recording '''
+        if self.recorder != None:
+            self.recorder.close()
+
+    def poll(self):
+        ''' Handles the results of the service calls '''
+        self.worker.poll()
+
+    def controlTick(self, center_box, speed, profiler):
+        ''' Applies a requested flightmode switch and publishes the single command of this tick '''
+        self.modes.tick()
+        mode = self.modes.mode
+        if mode == MANUAL:
+            self.manual_publish( self.currentCommand() )
+            profiler.mark( 'publish' )
+        elif mode in (AUTONOMOUS, LOST_TARGET):
+            snapshot = self.state.snapshot() # One consistent view of the callbacks per tick
+            now      = monotonic()
+            steered  = snapshot if self.estimator == None else self.estimator.estimate( snapshot, now )
+            command  = self.controller.step( now, steered, center_box, speed, self.frameSize() )
+            profiler.mark( 'control' )
+            self.publishCommand( command )
+            self.latency.commanded( snapshot.tracker, rospy.get_time() )
+            profiler.mark( 'publish' )
+            if self.controller.lost != (mode == LOST_TARGET):
+                self.modes.request( LOST_TARGET if self.controller.lost else AUTONOMOUS )
+        # Nothing is published in the emergency mode
+
+    def react(self):
+        ''' Applies a flightmode switch and publishes the command of the manual_flightmode right away, after a key '''
+        if self.modes.tick() and self.modes.mode == MANUAL:
+            return # Entering it published the command already
+        if self.modes.mode == MANUAL:
+            self.manual_publish( self.currentCommand() )
+
+    def stop(self):
+        ''' Doesn't leave the AR.Drone flying on the last command of the steering '''
+        if self.modes.mode in (AUTONOMOUS, LOST_TARGET):
+            self.publishCommand( self.controller.stop() )
+
+    def frame(self):
+        ''' The frame to draw, None before the first one '''
+        if self.decoder != None: # Compressed frames are only decoded when they are drawn
+            frame = self.decoder.frame()
+            if frame != None and not self.frozen:
+                self.image = frame
+        return self.image
+
+    def frameSize(self):
+        ''' Size of the videofeed in frame coordinates '''
+        image = self.image
+        if image == None:
+            return self.video_size
+        return (image.width, image.height)
+
+    def hover(self):
+        ''' Lets go of the movement keys '''
+        self.parameters = Twist()
+        self.held       = {}
+
+    def move(self, vector, axis, value):
+        ''' Sets an axis of self.parameters while its movement key is held, value 0 when it's released.
+            A press takes over from the autonomous steering, the axis is set when the manual_flightmode is entered '''
+        if value:
+            self.held[(vector, axis)] = value
+        else:
+            self.held.pop( (vector, axis), None )
+        if self.modes.mode in (AUTONOMOUS, LOST_TARGET):
+            if value: # Manual override
+                self.modes.request( MANUAL )
+            return
+        setattr( getattr(self.parameters, vector), axis, value )
+
+    def currentCommand(self):
+        ''' The Command of the current /cmd_vel parameters '''
+        return Command( self.parameters.linear.x, self.parameters.linear.y, self.parameters.linear.z, self.parameters.angular.z )
+
+    def publishCommand(self, command):
+        ''' Publishes an aggregated command on /cmd_vel '''
+        self.parameters.linear.x  = command.linear_x
+        self.parameters.linear.y  = command.linear_y
+        self.parameters.linear.z  = command.linear_z
+        self.parameters.angular.z = command.angular_z
+        self.publisher_parameters.publish( self.parameters )
+        if self.recorder != None:
+            self.recorder.command( command )
+
+    def tunable(self):
+        ''' True if the controller takes PID gains '''
+        return isinstance( self.controller, PIDController )
+
+    def updateGains(self, gains):
+        ''' Applies the PID gains of readGains(), so they can be tuned in flight '''
+        if not self.tunable():
+            return
+        try:
+            self.controller.setGains( *gains )
+        except ValueError as e:
+            print( "%sInvalid PID gains: %s" % (self.prefix, e) )
+
+    def sendTarget(self, image, box):
+        ''' Hands the target box selected in image to the TargetPublisher and the fallback tracker '''
+        self.target_publisher.send( image, box )
+        if self.fallback != None and image != None:
+            self.fallback.seed( image, box )
+
+    def resetTracker(self):
+        ''' Resets the tracker '''
+        self.publisher_reset_tracker.publish( String("r") )
+        if self.fallback != None:
+            self.fallback.stop()
+
+    def takeOffOrLand(self):
+        ''' Lands when airborne, takes off otherwise '''
+        if self.airborne:
+            print( self.prefix + "Landing" )
+            self.publisher_land.publish( Empty() )
+            self.airborne = False
+        else:
+            print( self.prefix + "Taking off" )
+            self.publisher_takeOff.publish( Empty() )
+            self.airborne = True
+
+    def reset(self):
+        ''' Reset signal for AR.Drone, toggles the emergency state of the driver, the flightmode stays '''
+        print( self.prefix + "Resetting" )
+        self.publisher_reset.publish( Empty() )
+
+    def emergency(self):
+        ''' Emergency stop, the reset cuts the motors of a drone that isn't in emergency yet.
+            A second one resets the drone again and returns to the manual_flightmode '''
+        if self.modes.mode == EMERGENCY:
+            self.reset()
+            self.modes.request( MANUAL )
+        else:
+            self.modes.request( EMERGENCY )
+
+    def toggleCam(self):
+        ''' Switches between camera feeds of the AR.Drone, without waiting for the driver '''
+        if not self.service_togglecam.call( self.__toggledCam ):
+            print( self.prefix + "Toggling camera still in progress" )
+
+    def __enterManual(self, previous):
+        if previous != EMERGENCY:
+            print( self.prefix + "Back to manual_flightmode" )
+            # Drops the last command of the controller, only the movement keys held to take over are kept
+            self.parameters = Twist()
+            for (vector, axis), value in self.held.items():
+                setattr( getattr(self.parameters, vector), axis, value )
+            self.publishCommand( self.currentCommand() ) # Replaces the last command of the controller right away
+        print( self.prefix + "Manual_flightmode = True" )
+
+    def __enterAutonomous(self, previous):
+        if previous == LOST_TARGET:
+            print( self.prefix + "Target found again" )
+            return
+        print( self.prefix + "In autonomous_flightmode" )
+        print( self.prefix + "ARdrone says: 'I can handle it myself'" )
+        self.controller.start( monotonic(), self.state.tracker, self.currentCommand() )
+        if self.estimator != None:
+            self.estimator.reset( self.state.tracker )
+
+    def __enterLostTarget(self, previous):
+        print( self.prefix + "Target lost, hovering until the tracker finds it again" )
+
+    def __enterEmergency(self, previous):
+        print( self.prefix + "Emergency, press emergency again to return to manual_flightmode" )
+        self.reset()
+        self.hover()
+        self.airborne = False
+
+    def __toggledCam(self, result, error):
+        ''' Called from the UI loop when the camera toggle finished '''
+        if error != None:
+            print( "%sService call failed: %s" % (self.prefix, error) )
+        else:
+            self.camera.toggle() # Only subscribe to the feed that is shown
+
+    def __connectToggleCam(self, timeout):
+        ''' Waits for the togglecam service and opens a persistent connection '''
+        service = self.namespace + '/ardrone/togglecam' if self.namespace else 'ardrone/togglecam'
+        rospy.wait_for_service( service, timeout )
+        return rospy.ServiceProxy( service, std_srvs.srv.Empty, persistent=True )
+
+    def __callback_camera(self, raw_image):
+        ''' Callback function for the camera feed '''
+        self.latency.arrived( frameId(raw_image), monotonic() )
+        if self.fallback != None:
+            self.fallback.frame( raw_image )
+        if self.decoder != None: # Compressed frame, kept until it is drawn
+            self.decoder.offer( raw_image )
+            return
+        if self.recorder != None:
+            self.recorder.frame( raw_image )
+        if not self.frozen:
+            self.image = raw_image
+
+    def __callback_tracker(self, tracking_box):
+        ''' Callback function for the rectangle '''
+        if self.recorder != None:
+            self.recorder.tracker( tracking_box )
+        self.state.tracker = trackerState( tracking_box ) # confidence variable by Ardillo, used for the elevator
+        self.tld_time = monotonic()
+        if self.fallback != None: # Corrects the drift of the fallback tracker
+            self.fallback.anchor( self.state.tracker )
+
+    def __callback_fallback(self, tracker):
+        ''' Box of the fallback tracker, used while tld_tracker is silent '''
+        if self.tld_time == None or monotonic() - self.tld_time > self.fallback_after:
+            self.state.tracker = tracker
+
+    def __callback_navdata(self, navdata):
+        ''' Callback function for the navdata feed '''
+        if self.recorder != None:
+            self.recorder.navdata( navdata )
+        self.state.navdata = navdataState( navdata )
+
+    def __callback_imu(self, imudata):
+        ''' Callback for the imu data feed '''
+        if self.recorder != None:
+            self.recorder.imu( imudata )
+        self.imu.append( imudata ) # Factors are only computed when the steering asks for them
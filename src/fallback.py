@@ -0,0 +1,199 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       fallback.py
+Description:    In-process tracker that bridges the gaps between the boxes
+                of tld_tracker. It is seeded with the selected target and
+                finds it again in every new frame by normalized
+                cross-correlation of a template, on a downscaled grayscale
+                search window around the last position. A large template is
+                searched for downscaled further, with its search window, and
+                the best position is refined with the whole template close
+                around it, so a large box costs little more than one of the
+                maximum size. It runs on its own
+                thread on the latest frame only. Every box of tld_tracker
+                re-anchors it, so it never drifts far.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import threading
+import numpy
+from numpy.lib.stride_tricks import as_strided
+import pygame
+from state import Box, TrackerState
+from compressed import DecodedFrame, decodeFrame
+
+
+def grayFrame(image, scale):
+    ''' Grayscale float32 array of a sensor_msgs/Image, CompressedImage or DecodedFrame, every scale th pixel
+
+    A DecodedFrame is only read on the thread that hands it to the display,
+    under its lock, pygame surfaces can't be blitted while another thread
+    reads them.
+    '''
+    if hasattr( image, 'format' ): # sensor_msgs/CompressedImage, the decoded surface is only used here
+        image = decodeFrame( image )
+    if isinstance( image, DecodedFrame ):
+        with image.lock: # The compositor may be drawing it
+            rgb = pygame.surfarray.array3d( image.surface )[::scale, ::scale].swapaxes( 0, 1 )
+    else:
+        channels = image.step // image.width
+        pixels = numpy.frombuffer( image.data, numpy.uint8 ).reshape( image.height, image.step )
+        rgb = pixels[::scale, :image.width * channels].reshape( -1, image.width, channels )[:, ::scale]
+    return rgb.mean( axis=2, dtype=numpy.float32 )
+
+
+def shrink(gray, step):
+    ''' gray downscaled by step, every pixel the mean of a step x step block, the partial blocks at the edges are left out '''
+    if step == 1:
+        return gray
+    h, w = gray.shape[0] // step, gray.shape[1] // step
+    return gray[:h * step, :w * step].reshape( h, step, w, step ).mean( axis=(1, 3) )
+
+
+def matchTemplate(search, template):
+    ''' Normalized cross-correlation of template at every position in search, (row, column, score) of the best '''
+    h, w = template.shape
+    rows, columns = search.shape[0] - h + 1, search.shape[1] - w + 1
+    if rows < 1 or columns < 1:
+        return 0, 0, -1.0
+    windows  = as_strided( search, shape=(rows, columns, h, w), strides=search.strides * 2 )
+    centered = template - template.mean()
+    norm     = numpy.sqrt( (centered * centered).sum() )
+    # The window mean drops out of the numerator because the template is centered
+    numerator = numpy.tensordot( windows, centered, axes=([2, 3], [0, 1]) )
+    sums      = windows.sum( axis=(2, 3) )
+    squares   = numpy.einsum( 'ijkl,ijkl->ij', windows, windows )
+    variance  = numpy.maximum( squares - sums * sums / (h * w), 1e-6 )
+    scores    = numerator / ( numpy.sqrt(variance) * max(norm, 1e-6) )
+    best      = numpy.argmax( scores )
+    row, column = divmod( int(best), columns )
+    return row, column, float( scores[row, column] )
+
+
+class TemplateTracker():
+    ''' Finds a template in frames, around its last position '''
+
+    def __init__(self, scale=4, search=1.0, min_score=0.5, max_template=24):
+        ''' Constructor, frames are downscaled by scale, the window extends search times the box size on every side.
+            A template with a side above max_template downscaled pixels is searched for downscaled further, 0 is no limit '''
+        self.scale     = scale
+        self.search    = search
+        self.min_score = min_score
+        self.max_template = max_template
+        self.template  = None
+        self.coarse    = None # The template downscaled by step
+        self.step      = 1    # Extra downscaling of the coarse search
+        self.box       = None # Last box in frame coordinates
+
+    def seed(self, gray, box):
+        ''' Takes the template at box, in frame coordinates, from the downscaled gray frame '''
+        s = self.scale
+        x, y = max( box[0] // s, 0 ), max( box[1] // s, 0 )
+        w, h = max( box[2] // s, 2 ), max( box[3] // s, 2 )
+        self.step = 1
+        if self.max_template > 0:
+            self.step = max( -(-max(w, h) // self.max_template), 1 ) # Rounded up
+        self.template = numpy.array( gray[y:y + h, x:x + w] )
+        self.coarse   = shrink( self.template, self.step )
+        self.box      = Box( *[int(v) for v in box] )
+
+    def track(self, gray):
+        ''' Box of the template in the downscaled gray frame and its score, None if it's not found '''
+        if self.template is None or self.template.size == 0:
+            return None, -1.0
+        s, k = self.scale, self.step
+        h, w = self.template.shape
+        margin_x, margin_y = int( self.search * w ) + 1, int( self.search * h ) + 1
+        left, top = max( self.box.x // s - margin_x, 0 ), max( self.box.y // s - margin_y, 0 )
+        right  = min( self.box.x // s + w + margin_x, gray.shape[1] )
+        bottom = min( self.box.y // s + h + margin_y, gray.shape[0] )
+        if k == 1:
+            row, column, score = matchTemplate( gray[top:bottom, left:right], self.template )
+        else: # Coarse search, refined within a coarse pixel around the best position
+            row, column, score = matchTemplate( shrink(gray[top:bottom, left:right], k), self.coarse )
+            top, left = max( top + row * k - k, 0 ), max( left + column * k - k, 0 )
+            row, column, score = matchTemplate( gray[top:top + h + 2 * k, left:left + w + 2 * k], self.template )
+        if score < self.min_score:
+            return None, score
+        self.box = Box( (left + column) * s, (top + row) * s, self.box.width, self.box.height )
+        return self.box, score
+
+
+class FallbackTracker():
+    ''' Runs a TemplateTracker on the latest frame on a background thread
+
+    callback(TrackerState) is called from that thread for every frame the
+    target is found in, with a negative seq and the stamp of the frame.
+    '''
+
+    def __init__(self, callback, scale=4, search=1.0, min_score=0.5, max_template=24):
+        ''' Constructor, starts the thread '''
+        self.callback  = callback
+        self.tracker   = TemplateTracker( scale, search, min_score, max_template )
+        self.condition = threading.Condition()
+        self.latest    = None # Frame not yet tracked
+        self.seed_gray = None # Gray frame to take a new template from
+        self.seed_box  = None # Box to take a new template at, from seed_gray or the next frame
+        self.active    = False
+        self.seq       = 0
+        self.thread    = threading.Thread( target=self.__loop, name='fallback' )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def seed(self, image, box):
+        ''' Starts tracking box, in frame coordinates, selected in image, to be called from the UI loop '''
+        gray = grayFrame( image, self.tracker.scale )
+        with self.condition:
+            self.seed_gray = gray
+            self.seed_box  = tuple( box )
+            self.active    = True
+            self.condition.notify()
+
+    def anchor(self, tracker):
+        ''' Moves to the box of the TrackerState tracker, the template is taken again from the next frame '''
+        if not self.active:
+            return
+        with self.condition:
+            self.seed_box = tuple( tracker.box )
+
+    def stop(self):
+        ''' Stops tracking until the next seed '''
+        self.active = False
+
+    def frame(self, image):
+        ''' Hands over a new frame, replaces a frame that wasn't tracked yet '''
+        if not self.active:
+            return
+        with self.condition:
+            self.latest = image
+            self.condition.notify()
+
+    def __loop(self):
+        while True:
+            with self.condition:
+                while self.latest == None and self.seed_gray is None:
+                    self.condition.wait()
+                if self.seed_gray is not None: # Seeded with the selected frame
+                    gray, self.seed_gray = self.seed_gray, None
+                    self.tracker.seed( gray, self.seed_box )
+                    self.seed_box = None
+                    continue
+                image, self.latest = self.latest, None
+                seed_box, self.seed_box = self.seed_box, None
+            if not self.active:
+                continue
+            try:
+                gray = grayFrame( image, self.tracker.scale )
+                if seed_box != None: # Anchored by tld_tracker
+                    self.tracker.seed( gray, seed_box )
+                    continue
+                box, score = self.tracker.track( gray )
+            except Exception as e:
+                print( "Fallback tracker failed: %s" % e )
+                continue
+            if box != None:
+                self.seq -= 1
+                self.callback( TrackerState(box, score, self.seq, image.header.stamp.secs, image.header.stamp.nsecs) )
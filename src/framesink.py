@@ -0,0 +1,67 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       framesink.py
+Description:    Writes the pixel data of sensor_msgs/Image messages straight
+                into one preallocated pygame surface, without creating a new
+                surface or intermediate copies for every frame.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import sys
+import pygame
+
+try:
+    buffer
+    def _write(view, data, offset, size, destination):
+        ''' Copies size bytes of data at offset into the surface buffer at destination '''
+        view.write( buffer(data, offset, size), destination ) # buffer() doesn't copy the string
+except NameError:
+    def _write(view, data, offset, size, destination):
+        ''' Copies size bytes of data at offset into the surface buffer at destination '''
+        memoryview(view)[destination:destination + size] = memoryview(data)[offset:offset + size]
+
+
+def _masks(encoding):
+    ''' Color masks of a 24 bit surface that matches the byte order of encoding '''
+    low, mid, high = 0x0000ff, 0x00ff00, 0xff0000
+    if sys.byteorder == 'big':
+        low, high = high, low
+    if encoding == 'rgb8':
+        return (low, mid, high, 0)
+    return (high, mid, low, 0)
+
+
+class FrameSink():
+    ''' Preallocated surface that camera frames are written into '''
+
+    ENCODINGS = ('rgb8', 'bgr8')
+
+    def __init__(self):
+        ''' Constructor, the surface is allocated on the first frame '''
+        self.surface  = None
+        self.encoding = None
+
+    def write(self, image):
+        ''' Copies the pixels of image into the surface and returns the surface '''
+        if image.encoding not in self.ENCODINGS:
+            raise ValueError( "Unsupported image encoding: %s" % image.encoding )
+        if self.surface == None or self.surface.get_size() != (image.width, image.height) or self.encoding != image.encoding:
+            self.surface  = pygame.Surface( (image.width, image.height), 0, 24, _masks(image.encoding) )
+            self.encoding = image.encoding
+
+        row   = image.width * 3
+        step  = image.step or row # Bytes per row in the message
+        pitch = self.surface.get_pitch()
+        view  = self.surface.get_buffer() # Locks the surface until released
+        try:
+            if step == pitch:
+                _write( view, image.data, 0, pitch * image.height, 0 )
+            else:
+                for y in range( image.height ):
+                    _write( view, image.data, y * step, row, y * pitch )
+        finally:
+            del view
+        return self.surface
@@ -0,0 +1,80 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       imu.py
+Description:    Ingestion of the IMU feed. The callback only copies the raw
+                sample into a preallocated ring buffer. Filtering and the
+                derived factors of the steering are computed on demand, over
+                the whole window at once.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import numpy
+from state import ImuState
+
+# Columns of the ring
+ORIENTATION_X, ORIENTATION_Y, ORIENTATION_Z, ACCELERATION_X, ACCELERATION_Y, ACCELERATION_Z = range(6)
+
+FILTERS = ('none', 'average', 'lowpass')
+
+
+class ImuRing():
+    ''' Ring buffer of raw IMU samples with filtered, derived values on request '''
+
+    def __init__(self, size=64, window=16, filter='lowpass', alpha=0.3):
+        ''' Constructor, filters the last window samples, alpha is the low-pass smoothing factor '''
+        if filter not in FILTERS:
+            raise ValueError( "Unknown IMU filter: %s" % filter )
+        if not 0 < window <= size / 2: # Leaves room for the callback to write while the window is read
+            raise ValueError( "IMU window must be between 1 and half the ring size" )
+        self.size    = size
+        self.window  = window
+        self.filter  = filter
+        self.samples = numpy.zeros( (size, 6) )
+        self.count   = 0 # Samples written in total, only changed by the callback
+        self.offsets = numpy.arange( -window, 0 )
+
+        # Weights of the low-pass filter, newest sample last
+        weights = alpha * (1 - alpha) ** numpy.arange( window - 1, -1, -1 )
+        self.weights = weights / weights.sum()
+
+    def append(self, imudata):
+        ''' Stores one sensor_msgs/Imu message, called at the full IMU rate '''
+        row = self.samples[self.count % self.size]
+        row[ORIENTATION_X]  = imudata.orientation.x
+        row[ORIENTATION_Y]  = imudata.orientation.y
+        row[ORIENTATION_Z]  = imudata.orientation.z
+        row[ACCELERATION_X] = imudata.linear_acceleration.x
+        row[ACCELERATION_Y] = imudata.linear_acceleration.y
+        row[ACCELERATION_Z] = imudata.linear_acceleration.z
+        self.count += 1
+
+    def latest(self):
+        ''' The last window samples (fewer at start up), oldest first '''
+        count = self.count
+        if count < self.window:
+            return self.samples[:count].copy()
+        return self.samples.take( (self.offsets + count) % self.size, axis=0 )
+
+    def filtered(self):
+        ''' The window reduced to one sample by the configured filter '''
+        samples = self.latest()
+        if len(samples) == 0:
+            return None
+        if self.filter == 'none' or len(samples) < self.window:
+            return samples[-1]
+        if self.filter == 'average':
+            return samples.mean( axis=0 )
+        return numpy.dot( self.weights, samples )
+
+    def state(self):
+        ''' ImuState with the factors of the steering, neutral before the first sample '''
+        sample = self.filtered()
+        if sample is None: # sample is an array, == would compare elementwise
+            return ImuState( 1.0, 1.0, 0.0, 0.0, 0.0, 0.0 )
+        factors = numpy.clip( 1 - numpy.abs(sample[ORIENTATION_X:ORIENTATION_Z]) * 10, 0, None )
+        compass = self.samples[(self.count - 1) % self.size, ORIENTATION_Z] # Not filtered, it wraps around at -1/1
+        return ImuState( float(factors[0]), float(factors[1]), float(compass),
+                         float(sample[ACCELERATION_X]), float(sample[ACCELERATION_Y]), float(sample[ACCELERATION_Z]) )
@@ -17,18 +17,22 @@ Created:        22-10-2012
 import roslib; roslib.load_manifest('ardrone_interface')
 import rospy
 import pygame
-import std_srvs.srv
 import time
 from subprocess import Popen
 from pygame.locals import * 
 from std_msgs.msg import *
-from geometry_msgs.msg import Twist
-from sensor_msgs.msg import Image
-from sensor_msgs.msg import Imu
-from tld_msgs.msg import BoundingBox
-from ardrone_autonomy.msg import Navdata
-from tld_msgs.msg import Target
-from datetime import datetime
+from diagnostic_msgs.msg import DiagnosticArray
+from display import WindowDisplay, HeadlessDisplay, CommandInput, SocketInput, tileGrid
+from scheduler import Scheduler, monotonic
+from services import Worker
+from drone import Drone, recordPath, readGains
+from profiler import PhaseProfiler, NullProfiler
+from modes import MANUAL, AUTONOMOUS
+from bindings import KeyDispatcher, DEFAULT_BINDINGS, mergeBindings, loadBindings
+
+
+# Sizes of the center_box for the keys 1 - 4, as fractions of the videofeed (64x46 ... 256x184 at 640x360)
+CENTER_BOXES = ( (0.1, 0.128), (0.2, 0.256), (0.3, 0.383), (0.4, 0.511) )
 
 
 class Interface():
@@ -36,68 +40,74 @@ class Interface():
 
     def __init__(self):
         ''' Constructor for setting up the User Interface '''
+        # Parameters are private to the node, so it's initialized first
+        rospy.init_node( 'interface' )
+
     	# Initialize pygame
         pygame.init()
         
-        # Initialize Clock
-        self.clock = pygame.time.Clock()
-
-        # Setup the main screen
-        self.resolution = (640, 460) # This is the screen size of AR.Drone 2. Works also for AR.Drone 1
-        self.screen     = pygame.display.set_mode( self.resolution )
-        pygame.display.set_caption( 'NLR: AR.Drone Keyboard Interface' )
-
-        # Setup the background
-        self.background = pygame.Surface( self.screen.get_size() )
-        self.background = self.background.convert()
-        self.background.fill( (255, 255, 255) )
-
-        # Setup logo
-        self.logo           = pygame.image.load( roslib.packages.get_pkg_dir('ardrone_interface')+ "/images/logo.png" ).convert()
-        self.logo_rect      = self.logo.get_rect()
-        self.logo_rect.left = 0
-        self.logo_rect.top  = 360
-	
-
-        self.background.blit( self.logo, self.logo_rect )
-        self.screen.blit( self.background, (0,0) )
-        pygame.display.flip()
-	
-        # ROS Settings
-        self.publisher_land           = rospy.Publisher(  '/ardrone/land',      Empty )
-        self.publisher_takeOff        = rospy.Publisher(  '/ardrone/takeoff',   Empty )
-	self.publisher_reset	      = rospy.Publisher(  '/ardrone/reset',     Empty ) #edited by Ardillo make a reset possible after over-tilt
-        self.publisher_parameters     = rospy.Publisher(  '/cmd_vel',           Twist )
-        self.publisher_tracking_box   = rospy.Publisher(  '/tld_gui_bb',        Target ) #merged from CamielV's repo
-	self.publisher_reset_tracker  = rospy.Publisher(  '/tld_gui_cmds', String)
-        self.subscriber_camera_front  = rospy.Subscriber( '/ardrone/front/image_raw',  Image, self.__callback_camera ) # Front image
-        self.subscriber_camera_bottom = rospy.Subscriber( '/ardrone/bottom/image_raw', Image, self.__callback_camera ) # Bottom image
-        self.subscriber_navdata       = rospy.Subscriber( '/ardrone/navdata', Navdata, self.__callback_navdata ) # Navdata
-	self.subscriber_imu           = rospy.Subscriber( '/ardrone/imu', Imu, self.__callback_imu ) # Imu
-        self.subscriber_tracker       = rospy.Subscriber( '/tld_tracked_object', BoundingBox, self.__callback_tracker ) # Tracker      
-        self.parameters               = Twist()
-        rospy.init_node( 'interface' )
+        # Main loop, the headless input wakes it up as soon as a command arrives
+        self.scheduler = Scheduler()
+
+        # Namespaces of the AR.Drones, the default is the topics of a single one
+        namespaces = rospy.get_param( '~drones', [''] )
+
+        # Setup the main screen, or none at all when headless
+        # The videofeed of the AR.Drone 2 is 640 x 360, the screen shows a preview scaled by preview_scale
+        # The previews of several AR.Drones are tiled in a grid
+        self.video_size = ( rospy.get_param('~video_width', 640), rospy.get_param('~video_height', 360) )
+        preview_scale   = rospy.get_param( '~preview_scale', 1.0 )
+        columns, rows   = tileGrid( len(namespaces) )
+        preview_size    = ( int(self.video_size[0] * preview_scale) * columns, int(self.video_size[1] * preview_scale) * rows )
+        self.resolution = ( preview_size[0], preview_size[1] + 100 ) # With room for the logo
+        if rospy.get_param( '~display', 'window' ) == 'headless':
+            if rospy.get_param( '~input', 'socket' ) == 'topic':
+                self.input = CommandInput( self.__inputArrived )
+                self.subscriber_input = rospy.Subscriber( '~input', String, lambda command: self.input.put(command.data) )
+            else:
+                self.input = SocketInput( rospy.get_param('~input_port', 7000), notify=self.__inputArrived )
+            self.display = HeadlessDisplay( self.input )
+        else:
+            self.display = WindowDisplay( self.resolution, (0, 0) + preview_size, roslib.packages.get_pkg_dir('ardrone_interface')+ "/images/logo.png",
+                                          self.video_size, len(namespaces), rospy.get_param('~compose_worker', False) )
+
+        # Reads of the parameter server run on a worker so they don't hold up the loop, every drone has its own for service calls
+        self.worker = Worker( 'parameters' )
+
+        # Topics, data and flightmode per AR.Drone, the keys go to the selected one
+        record      = rospy.get_param( '~record', '' )
+        self.drones = [ Drone(namespace, self.video_size,
+                              recordPath(record, namespace) if record and len(namespaces) > 1 else record,
+                              not self.display.headless) for namespace in namespaces ]
+        self.active = 0
+        self.drone  = self.drones[self.active]
+
+        # Latency instrumentation, reported on /diagnostics and with the l key on the screen
+        self.publisher_diagnostics = rospy.Publisher( '/diagnostics', DiagnosticArray )
+        self.latency_overlay    = False
+        self.diagnostics_period = 1.0 / rospy.get_param( '~diagnostics_rate', 1.0 )
+        self.diagnostics_next   = 0.0
+
+        # Per-phase timing of the loops, every ~profile th tick is sampled, 0 turns it off
+        profile       = rospy.get_param( '~profile', 0 )
+        self.profiler = PhaseProfiler( profile ) if profile > 0 else NullProfiler()
 
         # AR.Drone Variables
-        self.airborne = False
         self.speed    = 0.2
-        self.image    = None
-	self.manual_flightmode = True
-	self.confidence = None 	#confidence variable by Ardillo, has to be in front of ROS Settings.
-	self.header_seq = None
-	self.header_sec = None
-	self.old_seq = None
-	self.battery_percent = None
-	self.altitude = None
         self.init_width = None
         self.init_height = None
 
+        # Rates of the main loop in Hz
+        self.control_rate     = rospy.get_param( '~control_rate', 30 )
+        self.render_rate      = rospy.get_param( '~render_rate', 30 )
+        self.event_rate       = rospy.get_param( '~event_rate', 30 )
+        self.input_rate       = rospy.get_param( '~input_rate', 100 ) # Of polling the window, the headless input isn't polled
+        self.gains_next       = 0.0 # The PID gains are read again every second, on the worker
+        self.gains_job        = None
+
         # Tracking box
-        self.returning_tracking_box = pygame.Rect(641, 461, 1, 1)
-	# resolution videofeed = 640 x 360
-	self.center_box_width = 128  #64 #128 #192 #256
-	self.center_box_height = 92 #46 #92  #138 #184
-	self.center_box = pygame.Rect((320-(self.center_box_width/2)), (180-(self.center_box_height/2)), self.center_box_width, self.center_box_height )
+        # In frame coordinates, the box is kept in the middle of the videofeed
+        self.__setCenterBox( *self.__centerBoxSize(1) )
 	self.key_5 = False
 	self.key_6 = False
 	self.key_7 = False
@@ -110,218 +120,351 @@ class Interface():
         self.tracking = False
         self.tracking_box = None
 
-        # Select box
+        # Select box, in the videofeed of the selected drone
         self.selected    = False
         self.click_loc   = None
         self.release_loc = None
 	self.select_image = None
+
+        # Key bindings, the defaults with the overrides of ~bindings_file and ~bindings on top
+        bindings = DEFAULT_BINDINGS
+        if rospy.get_param( '~bindings_file', '' ):
+            bindings = mergeBindings( bindings, loadBindings(rospy.get_param('~bindings_file')) )
+        bindings  = mergeBindings( bindings, rospy.get_param('~bindings', {}) )
+        self.keys = KeyDispatcher( self.__actions(), bindings )
         
 
     def __del__(self):
         ''' Destructor of the User Interface'''
+        for drone in self.drones:
+            drone.close()
         pygame.quit()
 
     def run(self):
-        ''' Main loop, which refreshes the screen and handles User Input '''
+        ''' Main loop, control, events and rendering each run at their own rate in every flightmode, for all drones.
+            The input is handled as soon as it arrives '''
         print "Starting NLR: AR.Drone Keyboard Interface"
-        done = False
-
-	# resolution videofeed = 640 x 360
-	self.center_box_width = 64  #64 #128 #192 #256
-	self.center_box_height = 46 #46 #92  #138 #184
-	self.center_box = pygame.Rect((320-(self.center_box_width/2)), (180-(self.center_box_height/2)), self.center_box_width, self.center_box_height )
-
-
-        while not(done):
-	    # measurementbox has to change
-	    if self.key_5 and self.center_box_width > 1 and self.center_box_height > 1:
-		self.center_box_width -= 1
-		self.center_box_height -= 1
-                print "width:" , self.center_box_width , "height:" , self.center_box_height			
-	    elif self.key_6 and self.center_box_width <= (640 -1) and self.center_box_height <= (360 -1):
-		self.center_box_width += 1
-		self.center_box_height += 1			
-                print "width:" , self.center_box_width , "height:" , self.center_box_height
-	    elif self.key_7 and self.center_box_width > 1:
-		self.center_box_width -= 1
-                print "width:" , self.center_box_width , "height:" , self.center_box_height
-	    elif self.key_8 and self.center_box_width <= (640 -1):
-		self.center_box_width += 1
-                print "width:" , self.center_box_width , "height:" , self.center_box_height
-	    elif self.key_9 and self.center_box_height > 1:
-		self.center_box_height -= 1
-                print "width:" , self.center_box_width , "height:" , self.center_box_height
-	    elif self.key_0 and self.center_box_height <= (360 -1):
-		self.center_box_height += 1
-                print "width:" , self.center_box_width , "height:" , self.center_box_height
-	    self.center_box = pygame.Rect((320-(self.center_box_width/2)), (180-(self.center_box_height/2)), self.center_box_width, self.center_box_height )
-
-
-
-            for event in pygame.event.get():
-                # Check if window is quit
-                if event.type == pygame.QUIT:
-                    done = True
-                    break
-                # Check if mousebutton is pressed
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:
-                        if not(self.tracking):
-                            self.selected = True
-                            self.click_loc = event.pos
-			    self.select_image = self.image
-                # Check if mousebutton is released
-                elif event.type == pygame.MOUSEBUTTONUP:
-                    # Left mouse button
-                    if event.button == 1:
-                        if not(self.tracking):
-                            self.selected = False
-                            self.release_loc = event.pos
-                            self.__updateSelectBox()
-                # Check if mouse is moved
-                elif event.type == pygame.MOUSEMOTION:
-                    if not(self.tracking) and self.selected:
-                        self.release_loc = event.pos
-                        self.__updateSelectBox()
-
-                # Check if key is pressed
-                elif event.type == pygame.KEYDOWN:
-                    if   event.key == pygame.K_UP:
-                        self.parameters.linear.x = self.speed
-                    elif event.key == pygame.K_LEFT:
-                        self.parameters.linear.y = self.speed
-                    elif event.key == pygame.K_DOWN:
-                        self.parameters.linear.x = -self.speed
-                    elif event.key == pygame.K_RIGHT:
-                        self.parameters.linear.y = -self.speed
-                    elif event.key == pygame.K_w:
-                        self.parameters.linear.z = 3 *self.speed
-                    elif event.key == pygame.K_a:
-                        self.parameters.angular.z = 2 * self.speed
-                    elif event.key == pygame.K_s:
-                        self.parameters.linear.z = 3 * -self.speed
-                    elif event.key == pygame.K_d:
-                        self.parameters.angular.z = 2 * -self.speed
-                    elif event.key == pygame.K_c:
-                        self.__toggleCam()
-
-		    elif event.key == pygame.K_r: #edited by Ardillo making reset function
-			self.__reset()
-			
-		    elif event.key == pygame.K_1:  #edited by Ardillo making measurementbox realtime adjustable
-			self.center_box_width = 64  
-			self.center_box_height = 46 
-			self.center_box = pygame.Rect((320-(self.center_box_width/2)), (180-(self.center_box_height/2)), self.center_box_width, self.center_box_height )
-		    elif event.key == pygame.K_2:
-			self.center_box_width = 128 
-			self.center_box_height = 92 
-			self.center_box = pygame.Rect((320-(self.center_box_width/2)), (180-(self.center_box_height/2)), self.center_box_width, self.center_box_height )
-		    elif event.key == pygame.K_3:
-			self.center_box_width = 192 
-			self.center_box_height = 138
-			self.center_box = pygame.Rect((320-(self.center_box_width/2)), (180-(self.center_box_height/2)), self.center_box_width, self.center_box_height )
-		    elif event.key == pygame.K_4:
-		    	self.center_box_width = 256 
-			self.center_box_height = 184
-			self.center_box = pygame.Rect((320-(self.center_box_width/2)), (180-(self.center_box_height/2)), self.center_box_width, self.center_box_height )
-		    elif event.key == pygame.K_5:
-			self.key_5 = True
-		    elif event.key == pygame.K_6:
-			self.key_6 = True
-		    elif event.key == pygame.K_7:
-			self.key_7 = True
-		    elif event.key == pygame.K_8:
-			self.key_8 = True
-		    elif event.key == pygame.K_9:
-			self.key_9 = True
-		    elif event.key == pygame.K_0:
-			self.key_0 = True
-
-                    elif event.key == pygame.K_RETURN: #merged from CamielV's repo
-                        if self.tracking_box:
-                            self.tracking = True
-                            self.__sendTrackingBox()
-		    elif event.key == pygame.K_t: # tracker reset by Ardillo --not working properly-- TODO
-			if self.tracking == True:
-			    print"Resetting tracker"
-			    self.tracking_box = None
-			    self.tracking = False
-			str = "r"
-			self.publisher_reset_tracker.publish(String(str))
-
-                    elif event.key == pygame.K_MINUS:
-                        self.__switchSpeed( -0.01 ) #edited by Ardillo making it more sensible
-                        print self.speed
-                    elif event.key == pygame.K_EQUALS:
-                        self.__switchSpeed( 0.01 ) #edited by Ardillo making it more sensible
-                        print self.speed
-		    elif event.key == pygame.K_b:
-			print "Battery:", self.battery_percent
-                    elif event.key == pygame.K_SPACE:		    			
-                        if self.airborne:
-                            self.__land()
-                            self.airborne = False
-                        else:
-                            self.__takeOff()
-                            self.airborne = True
-		    elif event.key == pygame.K_m: # Boolean toggle by Ardillo
-			self.manual_flightmode = not self.manual_flightmode
-			print "Manual_flightmode =",self.manual_flightmode
-			if self.manual_flightmode == False:
-			    self.__trackObject()
-			    print "Manual_flightmode =",self.manual_flightmode
-			
-                # Check if key is released.
-                elif event.type == pygame.KEYUP:
-                    if   event.key == pygame.K_UP:
-                        self.parameters.linear.x = 0
-                    elif event.key == pygame.K_LEFT:
-                        self.parameters.linear.y = 0
-                    elif event.key == pygame.K_DOWN:
-                        self.parameters.linear.x = 0
-                    elif event.key == pygame.K_RIGHT:
-                        self.parameters.linear.y = 0
-                    elif event.key == pygame.K_w:
-                        self.parameters.linear.z = 0
-                    elif event.key == pygame.K_a:
-                        self.parameters.angular.z = 0
-                    elif event.key == pygame.K_s:
-                        self.parameters.linear.z = 0
-                    elif event.key == pygame.K_d:
-                        self.parameters.angular.z = 0
-		    elif event.key == pygame.K_5:
-			self.key_5 = False
-		    elif event.key == pygame.K_6:
-			self.key_6 = False
-		    elif event.key == pygame.K_7:
-			self.key_7 = False
-		    elif event.key == pygame.K_8:
-			self.key_8 = False
-		    elif event.key == pygame.K_9:
-			self.key_9 = False
-		    elif event.key == pygame.K_0:
-			self.key_0 = False
-
-            self.publisher_parameters.publish( self.parameters )
-            self.__draw()
-            self.clock.tick(30)
+        self.done = False
+
+        self.__setCenterBox( *self.__centerBoxSize(0) )
+
+        scheduler = self.scheduler
+        scheduler.add( self.control_rate, self.__controlTick )
+        scheduler.add( self.event_rate,   self.__eventTick )
+        if not self.display.headless:
+            scheduler.add( self.input_rate,  self.__inputTick ) # pygame can't wake the loop, its events are polled
+            scheduler.add( self.render_rate, self.__renderTick )
+        scheduler.run( lambda: self.done )
+
+        for drone in self.drones: # Don't leave an AR.Drone flying on its last command
+            drone.stop()
+        self.profiler.dump()
+
+    def __controlTick(self):
+        ''' Publishes the single command of this tick of every drone, in its own flightmode '''
+        self.profiler.tick( 'control' )
+        for drone in self.drones:
+            drone.controlTick( self.center_box, self.speed, self.profiler )
+
+    def __eventTick(self):
+        ''' Resizes the center_box and handles the results of the workers '''
+        self.profiler.tick( 'event' )
+        self.__adjustCenterBox()
+        self.profiler.mark( 'center_box' )
+        self.worker.poll()
+        for drone in self.drones:
+            drone.poll()
+        self.__reportLatency()
+        self.__updateGains()
+        self.profiler.mark( 'services' )
+
+    def __inputTick(self):
+        ''' Handles the User Input '''
+        self.profiler.tick( 'input' )
+        if not self.__pumpEvents():
+            self.done = True
+        self.profiler.mark( 'events' )
+
+    def __inputArrived(self):
+        ''' Called from the thread of the headless input for every event, handles it on the loop right away '''
+        self.scheduler.post( self.__inputTick )
+
+    def __renderTick(self):
+        ''' Redraws the camera feed '''
+        self.profiler.tick( 'render' )
+        self.__draw()
+        self.profiler.mark( 'draw' )
+
+    def __adjustCenterBox(self):
+        ''' Resizes the center_box while one of the keys 5 - 0 is held ''' #edited by Ardillo making measurementbox realtime adjustable
+        frame_width, frame_height = self.__frameSize()
+        if self.key_5 and self.center_box_width > 1 and self.center_box_height > 1:
+            self.center_box_width -= 1
+            self.center_box_height -= 1
+        elif self.key_6 and self.center_box_width <= (frame_width -1) and self.center_box_height <= (frame_height -1):
+            self.center_box_width += 1
+            self.center_box_height += 1
+        elif self.key_7 and self.center_box_width > 1:
+            self.center_box_width -= 1
+        elif self.key_8 and self.center_box_width <= (frame_width -1):
+            self.center_box_width += 1
+        elif self.key_9 and self.center_box_height > 1:
+            self.center_box_height -= 1
+        elif self.key_0 and self.center_box_height <= (frame_height -1):
+            self.center_box_height += 1
+        else:
+            return
+        print "width:" , self.center_box_width , "height:" , self.center_box_height
+        self.__setCenterBox( self.center_box_width, self.center_box_height )
+
+    def __pumpEvents(self):
+        ''' Handles the events of the display with the bindings of the flightmode, returns False when the window is quit.
+            After a key the command of the selected drone is published right away, not on the next control tick '''
+        keys = False
+        for event in self.display.events():
+            if event.type == pygame.QUIT:
+                return False
+            elif event.type == pygame.KEYDOWN:
+                self.keys.press( self.drone.modes.mode, event.key )
+                keys = True
+            elif event.type == pygame.KEYUP:
+                self.keys.release( self.drone.modes.mode, event.key )
+                keys = True
+            else:
+                self.__handleMouse( event )
+        if keys:
+            self.drone.react()
+        return True
+
+    def __handleMouse(self, event):
+        ''' Selecting a box to track with the left mouse button, in the videofeed of a drone, which gets the keys '''
+        # Check if mousebutton is pressed
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1:
+                tile = self.display.tileAt( event.pos )
+                if not(self.tracking) and tile != None:
+                    self.__selectDrone( tile )
+                    self.selected = True
+                    self.drone.frozen = True
+                    self.click_loc = self.display.toFrame( event.pos, self.active )
+                    self.select_image = self.drone.image
+        # Check if mousebutton is released
+        elif event.type == pygame.MOUSEBUTTONUP:
+            # Left mouse button
+            if event.button == 1:
+                if not(self.tracking) and self.selected:
+                    self.selected = False
+                    self.drone.frozen = False
+                    self.release_loc = self.display.toFrame( event.pos, self.active )
+                    self.__updateSelectBox()
+        # Check if mouse is moved
+        elif event.type == pygame.MOUSEMOTION:
+            if not(self.tracking) and self.selected:
+                self.release_loc = self.display.toFrame( event.pos, self.active )
+                self.__updateSelectBox()
+
+    def __actions(self):
+        ''' Actions the keys can be bound to, name -> (press, release) '''
+        return {
+            'forward':                 self.__move( 'linear', 'x', 1 ),
+            'backward':                self.__move( 'linear', 'x', -1 ),
+            'left':                    self.__move( 'linear', 'y', 1 ),
+            'right':                   self.__move( 'linear', 'y', -1 ),
+            'up':                      self.__move( 'linear', 'z', 3 ),
+            'down':                    self.__move( 'linear', 'z', -3 ),
+            'yaw_left':                self.__move( 'angular', 'z', 2 ),
+            'yaw_right':               self.__move( 'angular', 'z', -2 ),
+            'toggle_camera':           ( self.__toggleCam, None ),
+            'reset':                   ( self.__reset, None ),
+            'emergency':               ( self.__emergency, None ),
+            'center_box_small':        ( lambda: self.__setCenterBox(*self.__centerBoxSize(0)), None ),
+            'center_box_medium_small': ( lambda: self.__setCenterBox(*self.__centerBoxSize(1)), None ),
+            'center_box_medium':       ( lambda: self.__setCenterBox(*self.__centerBoxSize(2)), None ),
+            'center_box_medium_big':   ( lambda: self.__setCenterBox(*self.__centerBoxSize(3)), None ),
+            'center_box_smaller':      self.__hold( 'key_5' ),
+            'center_box_bigger':       self.__hold( 'key_6' ),
+            'center_box_narrower':     self.__hold( 'key_7' ),
+            'center_box_wider':        self.__hold( 'key_8' ),
+            'center_box_lower':        self.__hold( 'key_9' ),
+            'center_box_higher':       self.__hold( 'key_0' ),
+            'send_target':             ( self.__confirmTrackingBox, None ),
+            'reset_tracker':           ( self.__resetTracker, None ),
+            'slower':                  ( lambda: self.__changeSpeed(-0.01), None ), #edited by Ardillo making it more sensible
+            'faster':                  ( lambda: self.__changeSpeed(0.01), None ),
+            'battery':                 ( self.__printBattery, None ),
+            'camera_stats':            ( self.__printCameraStats, None ),
+            'latency':                 ( self.__toggleLatencyOverlay, None ),
+            'profile':                 ( self.profiler.dump, None ),
+            'takeoff_land':            ( self.__takeOffOrLand, None ),
+            'autonomous_flightmode':   ( self.__autonomousFlightmode, None ),
+            'manual_flightmode':       ( self.__manualFlightmode, None ),
+            'next_drone':              ( self.__nextDrone, None ),
+        }
+
+    def __move(self, vector, axis, factor):
+        ''' Press and release of a movement key, factor times the speed on an axis of the selected drone while held '''
+        def press():
+            self.drone.move( vector, axis, factor * self.speed )
+        def release():
+            self.drone.move( vector, axis, 0 )
+        return press, release
+
+    def __hold(self, flag):
+        ''' Press and release of a key that sets flag while held '''
+        return ( lambda: setattr(self, flag, True), lambda: setattr(self, flag, False) )
+
+    def __confirmTrackingBox(self):
+        ''' Starts tracking the selected box ''' #merged from CamielV's repo
+        if self.tracking_box:
+            self.tracking = True
+            self.__sendTrackingBox()
+
+    def __resetTracker(self):
+        ''' Resets the tracker ''' # tracker reset by Ardillo --not working properly-- TODO
+        if self.tracking == True:
+            print"Resetting tracker"
+            self.tracking_box = None
+            self.tracking = False
+        self.drone.resetTracker()
+
+    def __changeSpeed(self, speed):
+        ''' Changes the speed and prints it '''
+        self.__switchSpeed( speed )
+        print self.speed
+
+    def __printBattery(self):
+        for drone in self.drones:
+            print drone.prefix + "Battery:", drone.state.navdata.battery_percent
+
+    def __takeOffOrLand(self):
+        ''' Lands the selected drone when airborne, takes off otherwise '''
+        self.drone.takeOffOrLand()
+
+    def __autonomousFlightmode(self):
+        ''' Switches the selected drone to the autonomous_flightmode on the next tick '''
+        self.drone.modes.request( AUTONOMOUS )
+
+    def __manualFlightmode(self):
+        ''' Switches the selected drone back to the manual_flightmode on the next tick '''
+        self.drone.modes.request( MANUAL )
+
+    def __reset(self):
+        ''' Reset signal for the selected drone, e.g. to recover after an over-tilt, the flightmode stays '''
+        self.drone.reset()
+
+    def __emergency(self):
+        ''' Emergency stop of the selected drone, a second press resets it and returns to the manual_flightmode '''
+        self.drone.emergency()
+
+    def __nextDrone(self):
+        ''' Gives the keys to the next drone '''
+        self.__selectDrone( (self.active + 1) % len(self.drones) )
+
+    def __selectDrone(self, index):
+        ''' Gives the keys to drone index, the previous one lets go of the movement keys and its selected box '''
+        if index == self.active:
+            return
+        self.drone.hover()
+        self.drone.frozen = False
+        self.selected     = False
+        self.tracking_box = None
+        self.active = index
+        self.drone  = self.drones[index]
+        print "Keys control", self.drone.name
 
     def __draw(self):
-        ''' Draws the camera feed on the screen '''
-        if self.image == None:
+        ''' Draws the camera feed of every drone on its tile of the screen '''
+        if self.display.headless:
+            return
+        for tile, drone in enumerate( self.drones ):
+            image = drone.frame()
+            if image == None:
+                continue
+            overlays = []
+            tracker = drone.state.tracker
+            if tracker != None and drone.old_seq != tracker.seq: # don't show old rectangles
+                overlays.append( ((0, 0, 255), tracker.box, 2) )
+                drone.old_seq = tracker.seq
+            if drone is self.drone:
+                if self.tracking_box and self.tracking == False: # Made some changes so it doesn't stay drawed while tracking.
+                    overlays.append( ((0, 255, 0), self.tracking_box, 2) ) #merged from CamielV's repo
+                if len( self.drones ) > 1: # Border of the drone that has the keys
+                    overlays.append( ((255, 255, 0), (0, 0) + drone.frameSize(), 3) )
+            overlays.append( ((100, 100, 100), self.center_box, 1) )
+            if drone.service_togglecam.pending: # Camera toggle in progress
+                overlays.append( ((255, 200, 0), pygame.Rect(5, 5, 10, 10), 0) )
+            shown = self.display.draw( image, overlays, tile ) # Only decodes new frames and updates changed overlays
+            if shown != None:
+                drone.latency.shown( shown, monotonic() )
+                drone.camera.shown()
+
+    def __printCameraStats(self):
+        ''' Prints the counters of the camera feeds '''
+        for drone in self.drones:
+            camera = drone.camera
+            print drone.prefix + "Camera:", camera.active, "received:", camera.received, "dropped:", camera.dropped, \
+                  "displayed:", camera.displayed, "fps: %.1f" % camera.fps
+
+    def __updateGains(self):
+        ''' Reads the PID gains on the worker, so they can be tuned in flight without blocking the loop '''
+        now = monotonic()
+        if now < self.gains_next:
             return
- 	image = pygame.image.fromstring( self.image.data, (self.image.width, self.image.height), "RGB" )
-        self.background.blit( image, (0, 0) )
-	if self.old_seq == self.header_seq: # don't show old rectangles
-	    self.returning_tracking_box = pygame.Rect(641, 461, 1, 1)	
-	else:
-	    pygame.draw.rect( self.background, (0, 0, 255), self.returning_tracking_box, 2 )
-	self.old_seq = self.header_seq
-        if self.tracking_box and self.tracking == False: # Made some changes so it doesn't stay drawed while tracking.
-            pygame.draw.rect( self.background, (0, 255, 0), self.tracking_box, 2 ) #merged from CamielV's repo
-       	pygame.draw.rect( self.background, (100, 100, 100), self.center_box, 1 ) 
-        self.screen.blit( self.background, (0, 0) )
-        pygame.display.flip()
+        self.gains_next = now + 1.0
+        if self.gains_job in self.worker.pending or not any( drone.tunable() for drone in self.drones ):
+            return
+        self.gains_job = self.worker.submit( readGains, self.__readGains ) # Pending until it returns, so they never pile up
+
+    def __readGains(self, gains, error):
+        ''' Applies the PID gains read by the worker to every drone '''
+        if error != None:
+            print( "Reading the PID gains failed: %s" % error )
+            return
+        for drone in self.drones:
+            drone.updateGains( gains )
+
+    def __reportLatency(self):
+        ''' Publishes the latency of all drones on /diagnostics and updates the overlay, at the diagnostics rate '''
+        now = monotonic()
+        if now < self.diagnostics_next:
+            return
+        self.diagnostics_next = now + self.diagnostics_period
+        array = DiagnosticArray()
+        array.header.stamp = rospy.Time.now()
+        for drone in self.drones:
+            name = 'interface: latency' + ( ' ' + drone.name if drone.namespace else '' )
+            array.status.extend( drone.latency.diagnostics(array.header.stamp, name).status )
+        self.publisher_diagnostics.publish( array )
+        if self.latency_overlay:
+            self.display.status( self.__latencyLines() )
+
+    def __toggleLatencyOverlay(self):
+        ''' Shows or hides the latency percentiles of the selected drone next to the logo '''
+        self.latency_overlay = not self.latency_overlay
+        self.display.status( self.__latencyLines() if self.latency_overlay else [] )
+
+    def __latencyLines(self):
+        ''' Lines of the latency overlay '''
+        lines = self.drone.latency.lines()
+        if self.drone.namespace:
+            lines.insert( 0, self.drone.name )
+        return lines
+
+    def __frameSize(self):
+        ''' Size of the videofeed of the selected drone in frame coordinates '''
+        return self.drone.frameSize()
+
+    def __centerBoxSize(self, index):
+        ''' Width and height of one of the CENTER_BOXES in frame coordinates '''
+        frame_width, frame_height = self.__frameSize()
+        return int(round(CENTER_BOXES[index][0] * frame_width)), int(round(CENTER_BOXES[index][1] * frame_height))
+
+    def __setCenterBox(self, width, height):
+        ''' Sets the center_box to width x height in the middle of the videofeed '''
+        frame_width, frame_height = self.__frameSize()
+        self.center_box_width  = width
+        self.center_box_height = height
+        self.center_box = pygame.Rect((frame_width/2-(width/2)), (frame_height/2-(height/2)), width, height )
 
     def __updateSelectBox(self):
         if not(self.click_loc and self.release_loc):
@@ -350,332 +493,35 @@ class Interface():
             else:
                 min_x = x2
                 min_y = y2
-        if min_x > self.resolution[0]:
+        frame_width, frame_height = self.__frameSize()
+        if min_x > frame_width:
             return
-        if min_y > self.resolution[1] - 100:
+        if min_y > frame_height:
             return
-        if width_rect + min_x > self.resolution[0]:
+        if width_rect + min_x > frame_width:
             return
-        if height_rect + min_y > self.resolution[1] - 101:
+        if height_rect + min_y > frame_height - 1:
             return
         self.tracking_box = pygame.Rect(min_x, min_y, width_rect, height_rect)
 	#print"tracking_box", self.tracking_box
 
     def __sendTrackingBox(self):
-        target = Target()
-        target.bb.x          = self.tracking_box.x
-        target.bb.y          = self.tracking_box.y
-        target.bb.width      = self.tracking_box.width
-        target.bb.height     = self.tracking_box.height
-        target.bb.confidence = 1.0
-	#print "Target  =" , target
-        target.img           = self.select_image
-        self.publisher_tracking_box.publish( target )
+        ''' Hands the selected target to the TargetPublisher, doesn't wait for it to be sent '''
+        self.drone.sendTarget( self.select_image, self.tracking_box )
 	print "Bounding box send" 
-        self.clock.tick(100)
 	self.tracking_box = None
 	self.tracking = False
 	
 
     def __toggleCam(self):
-        ''' Switches between camera feeds of the AR.Drone '''
-        rospy.wait_for_service( 'ardrone/togglecam' )
-        try:
-            toggle = rospy.ServiceProxy( 'ardrone/togglecam', std_srvs.srv.Empty )
-            toggle()
-        except rospy.ServiceException, e:
-            print "Service call failed: %s"%e
-
-    def __takeOff(self):
-        ''' Take off signal for AR.Drone '''
-        print "Taking off"
-        self.publisher_takeOff.publish( Empty() )
-
-    def __land(self):
-        ''' Landing signal for AR.Drone '''
-        print "Landing"
-        self.publisher_land.publish( Empty() )
-
-    def __callback_camera(self, raw_image):
-        ''' Callback function for the camera feed '''
-        if self.tracking or not(self.selected):
-            self.image = raw_image
-
-    def __callback_tracker(self, tracking_box):
-        ''' Callback function for the rectangle'''
-	self.returning_tracking_box = pygame.Rect( tracking_box.x, tracking_box.y, tracking_box.width, tracking_box.height )
-	self.confidence = tracking_box.confidence # got the confidence variable, for future use. By Ardillo
-	self.header_seq = tracking_box.header.seq
-	self.header_sec = tracking_box.header.stamp.secs	
-
-    def __callback_navdata(self, navdata):
-        ''' Callback function for the camera feed '''
-        self.battery_percent = navdata.batteryPercent
-	self.altitude = navdata.altd
-   
-    def __callback_imu(self, imudata):
-	''' Callback for the imu data feed ''' # feedback from IMU, used for making PID controller
-	self.orientation_x = abs(imudata.orientation.x) * 10
-	self.orientation_x = 1 - self.orientation_x
-	if self.orientation_x < 0:
-	    self.orientation_x = 0
-	self.orientation_y = abs(imudata.orientation.y)	* 10
-	self.orientation_y = 1 - self.orientation_y
-	if self.orientation_y < 0:
-	    self.orientation_y = 0  
-	self.orientation_compass = imudata.orientation.z # from 0--1=-1--0
-	self.linear_acceleration_x = imudata.linear_acceleration.x 
-	self.linear_acceleration_y = imudata.linear_acceleration.y 
-	self.linear_acceleration_z = imudata.linear_acceleration.z 
-	#print "x:" , self.linear_acceleration_x , " y:" , self.linear_acceleration_y , " z:" , self.linear_acceleration_z
-	#print "orientation x:" , self.orientation_x , " y:" , self.orientation_y
-	#print "compass:" , self.orientation_compass
+        ''' Switches between camera feeds of the selected AR.Drone, without waiting for the driver '''
+        self.drone.toggleCam()
 
     def __switchSpeed( self, speed ):
         new_speed = self.speed + speed
         if new_speed >= -1 and new_speed <= 1:
             self.speed = new_speed
 
-    def __reset(self):				# edited by Ardillo making reset function
-	''' Reset signal for AR.Drone '''
-	print "Resetting"
-	self.publisher_reset.publish( Empty() )
-
-
-	# making an automated flight procedure by Ardillo, NO CONTROLS POSSIBLE EXCEPT EMERGENCY RESET
-    def __trackObject(self):			
-	''' Track the target '''
-	print "In autonomous_flightmode"
-	print "ARdrone says: 'I can handle it myself'"
-	done = False
-	firstTime = True
-	offset = 20				# in te stellen voor elevator-as
-	self.goLeft = False
-	self.strafeLeft = False
-	self.strafeRight = False
-	self.goRight = False
-        self.goBackward = False
-        self.goForward = False
-	self.goUp = False
-	self.goDown = False
-        self.startTime = datetime.now()
-	self.noTrackTime = datetime.now()
-	self.Left_timer = 0
-	self.Right_timer = 0
-	while not(done):
-		
-		# Fallback if object is lost longer than 1 second
-		if not firstTime:
-	    	    if self.startTime < self.noTrackTime:
-		    	if abs(self.startTime - self.noTrackTime ).seconds > 1:			
-	            	    print "no Track for" , abs(self.startTime - self.noTrackTime ).seconds , "seconds"
-                    	    self.parameters.linear.x = 0
-	 	    	    self.parameters.linear.y = 0
-		    	    self.parameters.linear.z = 0
-			    self.parameters.angular.z = 0
-	    	    	    self.publisher_parameters.publish( self.parameters )
-
-		# check location of Bounding box.
-	    	if self.returning_tracking_box.x <= 640 and self.returning_tracking_box.y <= 460:
-		    if firstTime:
-			self.init_width = self.returning_tracking_box.width
-			self.init_height = self.returning_tracking_box.height
-			firstTime = False
-			self.start_altitude = self.altitude
-			self.heading_at_start = self.orientation_compass
-
-		    self.center_tracking_box_x = self.returning_tracking_box.x + (self.returning_tracking_box.width / 2)
-		    self.center_tracking_box_y = self.returning_tracking_box.y + (self.returning_tracking_box.height / 2)
-		    
-		    	
-		    if self.old_seq != self.header_seq:	# only when tracking node publishes a new image
- 			self.startTime = datetime.now()
-			# # A factor from 0 - 1 for being not centered. Used for PID controller (P proportional)
-			self.factor_x = float(abs(self.center_tracking_box_x - 320))/320
-			self.factor_y = float(abs(self.center_tracking_box_y - 230))/230
-			#print "factor X:" , self.factor_x , "factor Y:" , self.factor_y			
-			
-			## Main steering signals
-
-			#testing code with compass
-			'''print "heading" , self.heading_at_start
-			if self.heading_at_start < 0:
-			    # right side of scale
-			    if self.orientation_compass < self.heading_at_start:
-  		                print "turn Left"
-			    	self.goLeft = True
-			    	self.integral_factor = self.orientation_x
-		            	self.parameters.angular.z = 2 * self.speed * self.factor_x * self.integral_factor
-	                    	self.publisher_parameters.publish( self.parameters )
-			    elif self.orientation_compass > self.heading_at_start:
-				print "turn Right"
-			    	self.goRight = True
-			    	self.integral_factor = self.orientation_x
-		            	self.parameters.angular.z = 2 * -self.speed * self.factor_x * self.integral_factor
-                            	self.publisher_parameters.publish( self.parameters )
-			elif self.heading_at_start > 0:
-			    # left side of scale
-			    if self.orientation_compass < self.heading_at_start:
-				print "turn Right"
-			    	self.goRight = True
-			    	self.integral_factor = self.orientation_x
-		            	self.parameters.angular.z = 2 * -self.speed * self.factor_x * self.integral_factor
-                            	self.publisher_parameters.publish( self.parameters )
-			    elif self.orientation_compass > self.heading_at_start:			     
-  		                print "turn Left"
-			    	self.goLeft = True
-			    	self.integral_factor = self.orientation_x
-		            	self.parameters.angular.z = 2 * self.speed * self.factor_x * self.integral_factor
-	                    	self.publisher_parameters.publish( self.parameters )
-			else:
-			    self.parameters.angular.z = 0
-                            self.publisher_parameters.publish( self.parameters ) '''
-			
- 			# testing code (steering commands for Roll)
-			if self.Left_timer > 3:
-		            print "strafe Left"
-			    self.strafeLeft = True
-			    self.Left_timer = 0
-			    self.integral_factor = self.orientation_x
-		            self.parameters.linear.y = self.speed * self.factor_x * self.integral_factor
-	                    self.publisher_parameters.publish( self.parameters )
-			elif self.Right_timer > 3:
-			    print "strafe Right"
-			    self.strafeRight = True
-			    self.Right_timer = 0
-			    self.integral_factor = self.orientation_x
-		            self.parameters.linear.y = -self.speed * self.factor_x * self.integral_factor
-                            self.publisher_parameters.publish( self.parameters )
-			else:
-			    self.parameters.linear.y = 0
-                            self.publisher_parameters.publish( self.parameters )
-			
-			# Basic steering commands Yaw
-                        if self.center_tracking_box_x < self.center_box.x:
-  		            print "turn Left"
-			    self.goLeft = True
-			    self.Left_timer += 1
-		            self.parameters.angular.z = 2 * self.speed * self.factor_x 
-	                    self.publisher_parameters.publish( self.parameters )
-			elif self.center_tracking_box_x > (self.center_box.x + self.center_box.width):
-			    print "turn Right"
-			    self.goRight = True
-			    self.Right_timer += 1
-		            self.parameters.angular.z = 2 * -self.speed * self.factor_x 
-                            self.publisher_parameters.publish( self.parameters )
-			else:
-			    self.parameters.angular.z = 0
-                            self.publisher_parameters.publish( self.parameters )
-
-			# Basic steering commands Pitch
-		    	if self.center_tracking_box_y < self.center_box.y:
-		            print "go Forward"
-			    self.goForward = True
-			    self.integral_factor = self.orientation_y
-		            self.parameters.linear.x = 0.5 * self.speed * self.factor_y * self.integral_factor
-                            self.publisher_parameters.publish( self.parameters )
-			elif self.center_tracking_box_y > (self.center_box.y + self.center_box.height):
-		            print "go Backward"
-			    self.goBackward = True
-			    self.integral_factor = self.orientation_y
-		            self.parameters.linear.y = - self.speed * self.factor_x * self.integral_factor
-			    self.publisher_parameters.publish( self.parameters )
-			else:
-			    self.parameters.linear.x = 0
-                            self.publisher_parameters.publish( self.parameters )	
-
-			# Basic steering commands elevator
-			if (self.returning_tracking_box.width + offset) < self.init_width or (self.returning_tracking_box.height + offset) < self.init_height:
-			    print "go Up"
-			    self.goUp = True
-			    self.parameters.linear.z = self.speed  * self.confidence
-			    self.publisher_parameters.publish( self.parameters )
-			elif (self.returning_tracking_box.width - offset) > self.init_width or (self.returning_tracking_box.height - offset) > self.init_height:
-			    print "go Down"
-			    self.goDown = True
-			    self.parameters.linear.z = -self.speed * self.confidence
-			    self.publisher_parameters.publish( self.parameters )
-			else:			    	
-			    self.parameters.linear.z = 0
-		            self.publisher_parameters.publish( self.parameters )
-			
-			## Correction if x-location object is in the center_box
-			if self.center_tracking_box_x > self.center_box.x and self.center_tracking_box_x < (self.center_box.x + self.center_box.width):
-			    # Correction roll and yaw axe
-			    if self.strafeLeft:
-				print "Correct Right"
-				self.strafeLeft = False
-				self.parameters.linear.y = -0.3
-				self.publisher_parameters.publish( self.parameters )
-			    if self.strafeRight:
-				print "Correct Left"
-				self.strafeRight = False
-				self.parameters.linear.y = 0.3
-				self.publisher_parameters.publish( self.parameters )
-			    self.parameters.linear.y = 0
-			    self.parameters.angular.z = 0
-			    self.publisher_parameters.publish( self.parameters )
-			
-			## Correction if x-location object is in the center_box
-			if self.center_tracking_box_y > self.center_box.y and self.center_tracking_box_y < (self.center_box.y + self.center_box.height):
-			    # Correction pitch axe
-			    if self.goForward:
-				print "correct Backward"
-				self.goForward = False
-				self.parameters.linear.x = -0.3
-				self.publisher_parameters.publish( self.parameters )
-			    if self.goBackward:
-				print "correct Forward"
-				self.goBackward = False
-				self.parameters.linear.x = 0.3
-				self.publisher_parameters.publish( self.parameters )
-			    self.parameters.linear.x = 0
-			    self.publisher_parameters.publish( self.parameters )
-			
-			# Correction altitude compared to starting altitude	
-		    	if self.altitude < self.start_altitude - 75:
-		    	    print "to Low, correcting myself"
-		    	    self.parameters.linear.z = self.speed 
-		    	    self.publisher_parameters.publish( self.parameters )
-		    	elif self.altitude > self.start_altitude + 75:
-		    	    print "to High, correcting myself"
-		    	    self.parameters.linear.z = -self.speed 	
-		    	    self.publisher_parameters.publish( self.parameters )
-		else:
-		    self.noTrackTime = datetime.now() 
-
-					    
-
-	        for event in pygame.event.get():
-        	    # Check if window is quit
-        	    if event.type == pygame.QUIT:
-        	        done = True
-        	        break
-			break
-        	    # Check if key is pressed
-        	    elif event.type == pygame.KEYDOWN:
-		        if  event.key == pygame.K_m:
-			    self.parameters.linear.x = 0
-			    self.parameters.linear.y = 0
-			    self.parameters.linear.z = 0
-			    self.parameters.angular.z = 0
-			    self.publisher_parameters.publish( self.parameters )		    
-			    print "Back to manual_flightmode"
-			    self.manual_flightmode = not self.manual_flightmode
-			    return
-		        elif event.key == pygame.K_r: 
-			    self.__reset()
-                        elif event.key == pygame.K_b:
-			    print "Battery:", self.battery_percent
-	                elif event.key == pygame.K_MINUS:
-        	            self.__switchSpeed( -0.01 ) #edited by Ardillo making it more sensible
-                            print self.speed
-                        elif event.key == pygame.K_EQUALS:
-                            self.__switchSpeed( 0.01 ) #edited by Ardillo making it more sensible
-                            print self.speed
-
-	        self.__draw()
-
 
 if __name__ == '__main__':
     ''' Starts up the software '''
@@ -0,0 +1,145 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       kalman.py
+Description:    Estimation of the tracked box between tracker updates. A
+                constant-velocity Kalman filter on the center and size of
+                the box is updated with every box of the tracker, weighted
+                by its confidence, and predicts the box at every control
+                tick. The matrices are allocated once, neither a prediction
+                nor an update allocates arrays. The predicted boxes get a new
+                seq every tick, so they're only steered on by the
+                PIDController, which steers on the box at every tick.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import numpy
+from state import Box, TrackerState
+
+
+class BoxKalman():
+    ''' Constant-velocity Kalman filter of center x, center y, width and height '''
+
+    def __init__(self, process_noise=4e4, measurement_noise=25.0, velocity_noise=1e4):
+        ''' Constructor, noise as variances: of the acceleration in px/s^2, the measured box in px and the first velocity in px/s '''
+        self.process_noise     = process_noise
+        self.measurement_noise = measurement_noise
+        self.velocity_noise    = velocity_noise
+        self.x  = numpy.zeros( 8 )        # center x, center y, width, height and their velocities
+        self.P  = numpy.zeros( (8, 8) )
+        self.F  = numpy.eye( 8 )
+        self.Q  = numpy.zeros( (8, 8) )
+        self.R  = numpy.zeros( (4, 4) )
+        self.S  = numpy.zeros( (4, 4) )
+        self.K  = numpy.zeros( (8, 4) )
+        self.KP = numpy.zeros( (8, 8) )
+        self.A  = numpy.zeros( (4, 8) )   # S and its inverse, see invert()
+        self.M  = numpy.zeros( (4, 8) )
+        self.column = numpy.zeros( 4 )
+        self.y  = numpy.zeros( 4 )
+        self.tx = numpy.zeros( 8 )
+        self.tP = numpy.zeros( (8, 8) )
+        self.position = numpy.arange( 4 )  # Indices of the values
+        self.velocity = numpy.arange( 4, 8 ) # and of their velocities
+        self.time = None
+
+    def reset(self, box, now):
+        ''' Starts at the Box box at time now, without velocity '''
+        self.x[:4] = ( box.x + box.width / 2.0, box.y + box.height / 2.0, box.width, box.height )
+        self.x[4:] = 0.0
+        self.P[:]  = 0.0
+        self.P[self.position, self.position] = self.measurement_noise
+        self.P[self.velocity, self.velocity] = self.velocity_noise
+        self.time  = now
+
+    def predict(self, now):
+        ''' Moves the estimate forward to time now '''
+        dt = now - self.time
+        if dt <= 0:
+            return
+        self.time = now
+        self.F[self.position, self.velocity] = dt
+        q = self.process_noise
+        self.Q[self.position, self.position] = q * dt ** 3 / 3
+        self.Q[self.position, self.velocity] = q * dt ** 2 / 2
+        self.Q[self.velocity, self.position] = q * dt ** 2 / 2
+        self.Q[self.velocity, self.velocity] = q * dt
+        numpy.dot( self.F, self.x, out=self.tx )
+        self.x[:] = self.tx
+        numpy.dot( self.F, self.P, out=self.tP )
+        numpy.dot( self.tP, self.F.T, out=self.P )
+        self.P += self.Q
+
+    def update(self, box, confidence, now):
+        ''' Corrects the estimate with the Box box measured at time now, less so for a low confidence '''
+        self.predict( now )
+        self.y[:] = ( box.x + box.width / 2.0, box.y + box.height / 2.0, box.width, box.height )
+        self.y   -= self.x[:4]
+        self.R[self.position, self.position] = self.measurement_noise / max( confidence, 0.05 )
+        numpy.add( self.P[:4, :4], self.R, out=self.S )
+        numpy.dot( self.P[:, :4], self.invert(), out=self.K )
+        self.x += numpy.dot( self.K, self.y, out=self.tx )
+        numpy.dot( self.K, self.P[:4, :], out=self.KP )
+        self.P -= self.KP
+
+    def invert(self):
+        ''' Inverse of S, by Gauss-Jordan elimination in place, S is positive definite so it needs no pivoting '''
+        A, column, M = self.A, self.column, self.M
+        A[:, :4] = self.S
+        A[:, 4:] = 0.0
+        A[self.position, self.velocity] = 1.0 # The identity, the velocity indices are 4 - 7 too
+        for i in range( 4 ):
+            A[i] /= A[i, i]
+            column[:] = A[:, i]
+            column[i] = 0.0 # Row i itself stays
+            numpy.multiply.outer( column, A[i], out=M )
+            A -= M
+        return A[:, 4:]
+
+    def box(self):
+        ''' Box of the estimate '''
+        cx, cy, width, height = self.x[:4]
+        return Box( int(cx - width / 2), int(cy - height / 2), int(width), int(height) )
+
+
+class TrackEstimator():
+    ''' Replaces the tracker box of snapshots by the predicted box at every tick
+
+    The predicted TrackerStates get their own, negative, seq numbers, so the
+    controller steers on every prediction. After horizon seconds without a
+    new box the last prediction is repeated, so the controller still notices
+    when the target is lost.
+    '''
+
+    def __init__(self, horizon=0.5, process_noise=4e4, measurement_noise=25.0):
+        ''' Constructor, predicts at most horizon seconds after the last box '''
+        self.horizon = horizon
+        self.kalman  = BoxKalman( process_noise, measurement_noise )
+        self.reset()
+
+    def reset(self, tracker=None):
+        ''' Forgets the estimate, the TrackerState tracker is already known and not used '''
+        self.seen      = None if tracker == None else tracker.seq
+        self.measured  = None # Time of the last box
+        self.seq       = 0
+        self.predicted = None
+
+    def estimate(self, snapshot, now):
+        ''' snapshot with the tracker box predicted for time now '''
+        tracker = snapshot.tracker
+        if tracker != None and tracker.seq != self.seen:
+            self.seen = tracker.seq
+            if self.measured == None:
+                self.kalman.reset( tracker.box, now )
+            else:
+                self.kalman.update( tracker.box, tracker.confidence, now )
+            self.measured = now
+        if self.measured == None:
+            return snapshot
+        if now - self.measured <= self.horizon:
+            self.kalman.predict( now )
+            self.seq -= 1
+            self.predicted = TrackerState( self.kalman.box(), tracker.confidence, self.seq, tracker.secs, tracker.nsecs )
+        return snapshot._replace( tracker=self.predicted )
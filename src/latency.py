@@ -0,0 +1,102 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       latency.py
+Description:    Latency instrumentation of the interface. Keeps rolling
+                windows of the camera-to-render latency (frame arrival in
+                the callback until it is on the screen) and the
+                tracker-to-command latency (header stamp of a tracker box
+                until the first /cmd_vel based on it), reported as p50, p95
+                and p99 on /diagnostics and on the screen.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import threading
+from collections import OrderedDict
+import numpy
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+
+CHANNELS    = ('render', 'control')
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram():
+    ''' Latest latencies in seconds, in a preallocated ring '''
+
+    def __init__(self, size=1024):
+        ''' Constructor, keeps the latest size samples '''
+        self.samples = numpy.zeros( size )
+        self.count   = 0
+
+    def add(self, seconds):
+        ''' Adds a sample, overwrites the oldest when the ring is full '''
+        self.samples[self.count % len(self.samples)] = seconds
+        self.count += 1
+
+    def percentiles(self):
+        ''' p50, p95 and p99 in seconds of the samples in the ring, None without samples '''
+        n = min( self.count, len(self.samples) )
+        if n == 0:
+            return None
+        return tuple( numpy.percentile(self.samples[:n], PERCENTILES) )
+
+
+class LatencyMonitor():
+    ''' Histograms of all channels and the arrival times of frames not yet drawn '''
+
+    def __init__(self, size=1024, pending=32):
+        ''' Constructor, size samples per channel, arrival times of at most pending frames '''
+        self.histograms = dict( (channel, LatencyHistogram(size)) for channel in CHANNELS )
+        self.arrivals   = OrderedDict() # Frame id -> arrival time
+        self.pending    = pending
+        self.lock       = threading.Lock() # Frames arrive on the ROS thread
+        self.tracker    = None # Seq of the last tracker box with a command
+
+    def arrived(self, frame, now):
+        ''' Frame with id frame arrived at now '''
+        with self.lock:
+            self.arrivals[frame] = now
+            while len(self.arrivals) > self.pending: # Never drawn
+                self.arrivals.popitem( last=False )
+
+    def shown(self, frame, now):
+        ''' Frame with id frame is on the screen at now '''
+        with self.lock:
+            arrival = self.arrivals.pop( frame, None )
+        if arrival != None:
+            self.histograms['render'].add( now - arrival )
+
+    def commanded(self, tracker, now):
+        ''' A command based on the TrackerState tracker is published at now, in ROS time '''
+        if tracker == None or tracker.seq == self.tracker or (tracker.secs == 0 and tracker.nsecs == 0):
+            return
+        self.tracker = tracker.seq
+        self.histograms['control'].add( now - (tracker.secs + tracker.nsecs * 1e-9) )
+
+    def lines(self):
+        ''' One line of text per channel '''
+        lines = []
+        for channel in CHANNELS:
+            histogram = self.histograms[channel]
+            percentiles = histogram.percentiles()
+            if percentiles == None:
+                lines.append( "%-8s no samples" % channel )
+            else:
+                lines.append( "%-8s p50 %6.1f  p95 %6.1f  p99 %6.1f ms" % ((channel,) + tuple(1000 * p for p in percentiles)) )
+        return lines
+
+    def diagnostics(self, stamp, name='interface: latency'):
+        ''' diagnostic_msgs/DiagnosticArray with the percentiles in ms of all channels '''
+        status = DiagnosticStatus( level=DiagnosticStatus.OK, name=name, message='camera-to-render and tracker-to-command latency' )
+        for channel in CHANNELS:
+            histogram = self.histograms[channel]
+            status.values.append( KeyValue(channel + ' samples', str(histogram.count)) )
+            percentiles = histogram.percentiles()
+            for p, value in zip( PERCENTILES, percentiles or (None,) * len(PERCENTILES) ):
+                status.values.append( KeyValue('%s p%d ms' % (channel, p), '-' if value == None else '%.1f' % (1000 * value)) )
+        array = DiagnosticArray()
+        array.header.stamp = stamp
+        array.status.append( status )
+        return array
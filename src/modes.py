@@ -0,0 +1,56 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       modes.py
+Description:    Flightmode state machine of the interface. A mode switch is
+                requested from anywhere, e.g. a key or the controller losing
+                the target, and takes effect at the start of the next
+                control tick, where the enter action of the new mode runs.
+                The main loop itself never changes.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+MANUAL      = 'manual'
+AUTONOMOUS  = 'autonomous'
+LOST_TARGET = 'lost_target'
+EMERGENCY   = 'emergency'
+MODES       = (MANUAL, AUTONOMOUS, LOST_TARGET, EMERGENCY)
+
+# Modes that can be switched to from each mode
+TRANSITIONS = {
+    MANUAL:      (AUTONOMOUS, EMERGENCY),
+    AUTONOMOUS:  (MANUAL, LOST_TARGET, EMERGENCY),
+    LOST_TARGET: (MANUAL, AUTONOMOUS, EMERGENCY),
+    EMERGENCY:   (MANUAL,),
+}
+
+
+class ModeMachine():
+    ''' Current flightmode and the switch requested for the next tick '''
+
+    def __init__(self, enter=None, mode=MANUAL):
+        ''' Constructor, enter maps a mode to a callable(previous mode) run when it is entered '''
+        self.mode    = mode
+        self.pending = None
+        self.enter   = enter or {}
+
+    def request(self, mode):
+        ''' Requests a switch to mode for the next tick, returns False if it can't be reached '''
+        if mode == self.mode: # Cancels a switch that didn't happen yet
+            self.pending = None
+            return True
+        if mode not in TRANSITIONS[self.mode]:
+            return False
+        self.pending = mode
+        return True
+
+    def tick(self):
+        ''' Applies a requested switch, returns whether the mode changed '''
+        if self.pending == None:
+            return False
+        previous, self.mode, self.pending = self.mode, self.pending, None
+        enter = self.enter.get( self.mode )
+        if enter != None:
+            enter( previous )
+        return True
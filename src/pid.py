@@ -0,0 +1,85 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       pid.py
+Description:    PID controller for all four axes of the AR.Drone at once.
+                Gains, error, integral and derivative are numpy vectors in
+                the order of commands.AXES, so a tick is a handful of vector
+                operations on preallocated arrays. Integration stops on an
+                axis whose output is saturated in the direction of its error
+                (anti-windup), and the integral is clamped besides.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import numpy
+from commands import AXES
+
+
+class VectorPID():
+    ''' Proportional, integral and derivative terms of every axis '''
+
+    def __init__(self, kp, ki, kd, integral_limit=1.0):
+        ''' Constructor, gains are a value per axis or one value for all '''
+        size = len( AXES )
+        self.kp = numpy.zeros( size )
+        self.ki = numpy.zeros( size )
+        self.kd = numpy.zeros( size )
+        self.integral_limit = numpy.zeros( size )
+        self.setGains( kp, ki, kd, integral_limit )
+
+        self.error      = numpy.zeros( size )
+        self.previous   = numpy.zeros( size )
+        self.integral   = numpy.zeros( size )
+        self.candidate  = numpy.zeros( size )
+        self.derivative = numpy.zeros( size )
+        self.output     = numpy.zeros( size )
+        self.scratch    = numpy.zeros( size )
+        self.first      = True
+
+    def setGains(self, kp, ki, kd, integral_limit=None):
+        ''' Replaces the gains, keeps the integral '''
+        self.kp[:] = kp
+        self.ki[:] = ki
+        self.kd[:] = kd
+        if integral_limit != None:
+            self.integral_limit[:] = integral_limit
+
+    def reset(self):
+        ''' Forgets the integral and the previous error '''
+        self.integral[:] = 0.0
+        self.first       = True
+
+    def update(self, error, dt, limit):
+        ''' Output per axis for the error per axis, dt seconds after the previous one, clipped to +- limit per axis
+
+        The returned array is reused by the next update.
+        '''
+        self.error[:] = error
+        if self.first or dt <= 0:
+            self.derivative[:] = 0.0
+            self.first = False
+        else:
+            numpy.subtract( self.error, self.previous, out=self.derivative )
+            self.derivative /= dt
+        self.previous[:] = self.error
+
+        # Integrate, then keep the old integral where the output would wind up
+        numpy.multiply( self.error, dt, out=self.candidate )
+        self.candidate += self.integral
+        numpy.clip( self.candidate, -self.integral_limit, self.integral_limit, out=self.candidate )
+        self.__combine( self.candidate )
+        windup = (numpy.abs(self.output) > limit) & (self.output * self.error > 0)
+        numpy.putmask( self.integral, ~windup, self.candidate )
+
+        self.__combine( self.integral )
+        numpy.clip( self.output, -numpy.asarray(limit), limit, out=self.output )
+        return self.output
+
+    def __combine(self, integral):
+        numpy.multiply( self.kp, self.error, out=self.output )
+        numpy.multiply( self.ki, integral, out=self.scratch )
+        self.output += self.scratch
+        numpy.multiply( self.kd, self.derivative, out=self.scratch )
+        self.output += self.scratch
@@ -0,0 +1,76 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       profiler.py
+Description:    Per-phase timing of the main loops. Every Nth tick of each
+                task is sampled: the time between the start of the tick and
+                each marked phase is added to that phase. Each task counts
+                its own ticks, so tasks that run in lockstep are all
+                sampled. The other ticks only count, so profiling a running
+                interface costs next to nothing. NullProfiler is used when
+                profiling is off.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+from scheduler import monotonic
+
+
+class PhaseProfiler():
+    ''' Accumulated time per phase of every Nth tick of each task '''
+
+    def __init__(self, every=10):
+        ''' Constructor, samples one in every ticks of a task '''
+        self.every   = every
+        self.ticks   = {} # Task -> ticks
+        self.sampled = False
+        self.last    = 0.0
+        self.phases  = {} # Name -> [sampled ticks, total seconds, maximum seconds]
+
+    def tick(self, task):
+        ''' Starts a tick of task, the next mark times from here '''
+        ticks = self.ticks[task] = self.ticks.get( task, 0 ) + 1
+        self.sampled = ticks % self.every == 0
+        if self.sampled:
+            self.last = monotonic()
+
+    def mark(self, phase):
+        ''' Ends phase, which ran since the start of the tick or the previous mark '''
+        if not self.sampled:
+            return
+        now = monotonic()
+        elapsed, self.last = now - self.last, now
+        totals = self.phases.get( phase )
+        if totals == None:
+            totals = self.phases[phase] = [0, 0.0, 0.0]
+        totals[0] += 1
+        totals[1] += elapsed
+        totals[2] = max( totals[2], elapsed )
+
+    def report(self):
+        ''' Lines of the breakdown, the phase with the most time first '''
+        counts = ", ".join( "%s %d" % item for item in sorted(self.ticks.items()) )
+        lines = [ "%s ticks, every %d sampled" % (counts or "no", self.every),
+                  "%-24s %8s %10s %10s %8s" % ("phase", "samples", "mean ms", "max ms", "share") ]
+        total = sum( totals[1] for totals in self.phases.values() ) or 1.0
+        for phase, (samples, seconds, maximum) in sorted( self.phases.items(), key=lambda item: -item[1][1] ):
+            lines.append( "%-24s %8d %10.3f %10.3f %7.1f%%" % (phase, samples, 1000 * seconds / samples, 1000 * maximum, 100 * seconds / total) )
+        return lines
+
+    def dump(self):
+        ''' Prints the breakdown '''
+        print( "\n".join(self.report()) )
+
+
+class NullProfiler():
+    ''' Profiler that measures nothing '''
+
+    def tick(self, task):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def dump(self):
+        print( "Profiling is off, start the interface with ~profile set" )
@@ -0,0 +1,172 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       recorder.py
+Description:    Flight recorder for navdata, IMU, tracker boxes and the
+                published commands. Records are fixed-width rows in a
+                preallocated memory-mapped file, so recording never waits
+                for the disk. Camera frames can be kept as well, in separate
+                chunk files that are created ahead of time on a background
+                thread, up to a maximum number of chunks. FlightLog reads a recording back as NumPy arrays.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import itertools
+import threading
+import time
+import numpy
+
+# Channels and the names of their values
+CHANNELS = {
+    'navdata': (1, ('battery_percent', 'altitude')),
+    'imu':     (2, ('orientation_x', 'orientation_y', 'orientation_z', 'linear_acceleration_x', 'linear_acceleration_y', 'linear_acceleration_z')),
+    'tracker': (3, ('x', 'y', 'width', 'height', 'confidence')),
+    'command': (4, ('linear_x', 'linear_y', 'linear_z', 'angular_z')),
+    'frame':   (5, ('chunk', 'slot', 'slot_size', 'width', 'height', 'step', 'bgr')),
+}
+
+# Columns of a record: time, channel, seq and up to 8 values
+TIME, CHANNEL, SEQ, VALUES = 0, 1, 2, 3
+COLUMNS = VALUES + 8
+
+
+class FlightRecorder():
+    ''' Writes records into a preallocated memory-mapped file, wrapping around when full '''
+
+    def __init__(self, path, capacity=1000000, frames=False, frame_chunk=100, frame_chunks=10):
+        ''' Constructor, capacity in records, frame_chunk is the number of frames per chunk file,
+            at most frame_chunks files are written, the frames after them are dropped '''
+        self.path        = path
+        self.capacity    = capacity
+        self.rows        = numpy.memmap( path, numpy.float64, 'w+', shape=(capacity, COLUMNS) )
+        self.index       = itertools.count() # next() is atomic, so the callbacks need no lock
+        self.frames      = frames
+        self.frame_chunk = frame_chunk
+        self.frame_chunks = frame_chunks
+        self.written     = 0    # Frames recorded, only used by the camera callback
+        self.chunk       = None # (number, memmap) of the current frame chunk
+        self.prepared    = None # (number, memmap) of the next chunk, created by the preparer
+        self.preparer    = None # Thread creating the next chunk
+        self.slot_size   = None
+        self.dropped     = 0    # Frames that didn't fit in a slot, came before their chunk was created or after the last chunk
+
+    def __write(self, channel, seq, values):
+        row = self.rows[next(self.index) % self.capacity]
+        row[TIME]    = 0.0 # Cleared first, a wrapped row that is half written is ignored by the reader
+        row[VALUES:VALUES + len(values)] = values
+        row[SEQ]     = seq
+        row[CHANNEL] = CHANNELS[channel][0]
+        row[TIME]    = time.time() # Written last, a row without time is ignored by the reader
+
+    def navdata(self, navdata):
+        ''' Records an ardrone_autonomy/Navdata message '''
+        self.__write( 'navdata', navdata.header.seq, (navdata.batteryPercent, navdata.altd) )
+
+    def imu(self, imudata):
+        ''' Records a sensor_msgs/Imu message '''
+        self.__write( 'imu', imudata.header.seq, (imudata.orientation.x, imudata.orientation.y, imudata.orientation.z,
+                      imudata.linear_acceleration.x, imudata.linear_acceleration.y, imudata.linear_acceleration.z) )
+
+    def tracker(self, box):
+        ''' Records a tld_msgs/BoundingBox message '''
+        self.__write( 'tracker', box.header.seq, (box.x, box.y, box.width, box.height, box.confidence) )
+
+    def command(self, command):
+        ''' Records a published Command '''
+        self.__write( 'command', 0, command )
+
+    def frame(self, image):
+        ''' Records a sensor_msgs/Image message, if recording of frames is enabled '''
+        if not self.frames:
+            return
+        if self.slot_size == None:
+            self.slot_size = len( image.data )
+            self.__prepare( 0 )
+        number, slot = divmod( self.written, self.frame_chunk )
+        if len( image.data ) > self.slot_size or number >= self.frame_chunks:
+            self.dropped += 1
+            return
+        chunk = self.chunk
+        if chunk == None or chunk[0] != number:
+            if self.preparer.is_alive(): # Creating the file here would stall the camera
+                self.dropped += 1
+                return
+            self.preparer.join()
+            chunk = self.chunk = self.prepared
+            if chunk == None:
+                self.frames = False
+                return
+            if number + 1 < self.frame_chunks:
+                self.__prepare( number + 1 )
+        self.written += 1
+        chunk[1][slot, :len(image.data)] = numpy.frombuffer( image.data, numpy.uint8 )
+        self.__write( 'frame', image.header.seq, (number, slot, self.slot_size, image.width, image.height, image.step, image.encoding == 'bgr8') )
+
+    def close(self):
+        ''' Flushes the recording to disk, removes a chunk that was prepared but not used '''
+        self.rows.flush()
+        if self.chunk != None:
+            self.chunk[1].flush()
+        if self.preparer != None:
+            self.preparer.join()
+            if self.prepared != None and self.prepared is not self.chunk:
+                number = self.prepared[0]
+                self.prepared = None
+                os.remove( framePath(self.path, number) )
+
+    def __prepare(self, number):
+        ''' Creates chunk number on the preparer thread '''
+        self.prepared = None
+        def create():
+            try:
+                self.prepared = (number, numpy.memmap( framePath(self.path, number), numpy.uint8, 'w+',
+                                                       shape=(self.frame_chunk, self.slot_size) ))
+            except (IOError, OSError, ValueError) as e:
+                print( "Creating frame chunk %d failed, frames are no longer recorded: %s" % (number, e) )
+        self.preparer = threading.Thread( target=create, name='recorder' )
+        self.preparer.daemon = True
+        self.preparer.start()
+
+
+def framePath(path, number):
+    ''' Path of a frame chunk file of the recording at path '''
+    return "%s.frames.%03d" % (path, number)
+
+
+class FlightLog():
+    ''' Reads a recording of the FlightRecorder '''
+
+    def __init__(self, path):
+        ''' Constructor, maps the recording at path '''
+        self.path = path
+        rows = numpy.memmap( path, numpy.float64, 'r' ).reshape( -1, COLUMNS )
+        rows = rows[rows[:, TIME] > 0]
+        self.rows = rows[numpy.argsort(rows[:, TIME], kind='mergesort')] # Undo the wrap around
+
+    def channels(self):
+        ''' Names of the channels with records '''
+        present = set( self.rows[:, CHANNEL].astype(int) )
+        return sorted( name for name, (number, fields) in CHANNELS.items() if number in present )
+
+    def channel(self, name):
+        ''' Dictionary of arrays with the time, seq and values of channel name '''
+        number, fields = CHANNELS[name]
+        rows = self.rows[self.rows[:, CHANNEL] == number]
+        arrays = { 'time': rows[:, TIME], 'seq': rows[:, SEQ].astype(numpy.int64) }
+        for i, field in enumerate( fields ):
+            arrays[field] = rows[:, VALUES + i]
+        return arrays
+
+    def frame(self, i):
+        ''' The i-th recorded frame as a (height, width, 3) array of RGB pixels '''
+        frames = self.channel( 'frame' )
+        number, slot, size = int(frames['chunk'][i]), int(frames['slot'][i]), int(frames['slot_size'][i])
+        width, height, step = int(frames['width'][i]), int(frames['height'][i]), int(frames['step'][i])
+        chunk  = numpy.memmap( framePath(self.path, number), numpy.uint8, 'r' )
+        pixels = chunk[slot * size:slot * size + step * height].reshape( height, step )[:, :width * 3].reshape( height, width, 3 )
+        if frames['bgr'][i]:
+            pixels = pixels[:, :, ::-1]
+        return numpy.array( pixels )
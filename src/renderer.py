@@ -0,0 +1,98 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       renderer.py
+Description:    Draws the camera feed and the overlay rectangles of the
+                interface. A frame is only decoded when the camera delivered
+                a new one; when only the overlays change, just the affected
+                areas of the screen are updated. Frames of another size than
+                the video region are scaled into a preview, while overlays
+                and mouse positions stay in frame coordinates.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import pygame
+from framesink import FrameSink
+from compressed import DecodedFrame
+
+
+def frameId(image):
+    ''' Identity of a camera frame, taken from its header '''
+    return (image.header.frame_id, image.header.seq, image.header.stamp.secs, image.header.stamp.nsecs)
+
+
+class Renderer():
+    ''' Renders camera frames with overlays onto the video region of the screen '''
+
+    def __init__(self, screen, video_rect, frame_size=None, update=pygame.display.update):
+        ''' Constructor, video_rect is the part of the screen showing the feed of frame_size frames.
+            update(rect or list of rects) is called with the areas that were drawn '''
+        self.screen     = screen
+        self.video_rect = pygame.Rect( video_rect )
+        self.update     = update
+        self.sink       = FrameSink()
+        self.preview    = None  # Preallocated surface of scaled frames
+        self.frame      = None  # Surface of the frame on screen
+        self.frame_id   = None
+        self.overlays   = []    # Overlays (color, rect, width) on screen, in screen coordinates
+        self.__setScale( frame_size or self.video_rect.size )
+
+    def draw(self, image, overlays):
+        ''' Draws image with the given overlays in frame coordinates, skipping work that was already done.
+            Returns whether image was a new frame '''
+        frame_id  = frameId( image )
+        new_frame = frame_id != self.frame_id
+        if new_frame:
+            surface       = image.surface if isinstance(image, DecodedFrame) else self.sink.write( image )
+            self.frame    = self.__scaled( surface ) # Reuses preallocated surfaces
+            self.frame_id = frame_id
+        overlays = [ (color, self.__toScreen(rect), width) for color, rect, width in overlays ]
+        if new_frame:
+            self.screen.blit( self.frame, self.video_rect )
+            self.__drawOverlays( overlays )
+            self.update( self.video_rect )
+        elif overlays != self.overlays:
+            dirty = [ self.__dirtyRect(rect, width) for color, rect, width in self.overlays + overlays ]
+            dirty = [ rect for rect in dirty if rect.width and rect.height ]
+            for rect in dirty:
+                self.screen.blit( self.frame, rect, rect.move(-self.video_rect.x, -self.video_rect.y) )
+            self.__drawOverlays( overlays )
+            self.update( dirty )
+        self.overlays = overlays
+        return new_frame
+
+    def toFrame(self, pos):
+        ''' Frame coordinates of a position on the screen '''
+        return ( int((pos[0] - self.video_rect.x) / self.scale[0]), int((pos[1] - self.video_rect.y) / self.scale[1]) )
+
+    def __setScale(self, frame_size):
+        self.scale = ( float(self.video_rect.width) / frame_size[0], float(self.video_rect.height) / frame_size[1] )
+
+    def __scaled(self, surface):
+        ''' surface scaled to the video region, or surface itself if it already fits '''
+        self.__setScale( surface.get_size() )
+        if surface.get_size() == self.video_rect.size:
+            return surface
+        if self.preview == None or self.preview.get_bitsize() != surface.get_bitsize() or self.preview.get_masks() != surface.get_masks():
+            self.preview = pygame.Surface( self.video_rect.size, 0, surface )
+        pygame.transform.scale( surface, self.video_rect.size, self.preview )
+        return self.preview
+
+    def __toScreen(self, rect):
+        ''' Screen rectangle of a rectangle in frame coordinates '''
+        x, y, width, height = rect
+        sx, sy = self.scale
+        return pygame.Rect( self.video_rect.x + int(x * sx), self.video_rect.y + int(y * sy), max(1, int(width * sx)), max(1, int(height * sy)) )
+
+    def __drawOverlays(self, overlays):
+        ''' Draws the overlay rectangles, clipped to the video region '''
+        self.screen.set_clip( self.video_rect )
+        for color, rect, width in overlays:
+            pygame.draw.rect( self.screen, color, rect, width )
+        self.screen.set_clip( None )
+
+    def __dirtyRect(self, rect, width):
+        ''' Screen area covered by an overlay outline '''
+        return rect.inflate( 2 * width, 2 * width ).clip( self.video_rect )
@@ -0,0 +1,131 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       replay.py
+Description:    Offline replay of the autonomous flightmode. Feeds recorded
+                or synthetic, timestamped tracker, navdata and IMU messages
+                to a TrackingController, ticking it at a fixed rate in replay
+                time, and collects the Commands it emits. Needs no drone, ROS
+                master or display and runs faster than real time.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import math
+from state import StateStore, Box, trackerState, navdataState
+from imu import ImuRing
+
+
+class Message(object):
+    ''' Stand-in for a ROS message, with the given fields as attributes '''
+
+    def __init__(self, **fields):
+        self.__dict__.update( fields )
+
+
+def boundingBox(seq, x, y, width, height, confidence=1.0):
+    ''' Stand-in for a tld_msgs/BoundingBox message '''
+    header = Message( seq=seq, stamp=Message(secs=0, nsecs=0) )
+    return Message( header=header, x=x, y=y, width=width, height=height, confidence=confidence )
+
+
+def navdata(battery_percent, altitude):
+    ''' Stand-in for an ardrone_autonomy/Navdata message '''
+    return Message( batteryPercent=battery_percent, altd=altitude )
+
+
+def imu(orientation, linear_acceleration=(0.0, 0.0, 0.0)):
+    ''' Stand-in for a sensor_msgs/Imu message '''
+    x, y, z = orientation
+    ax, ay, az = linear_acceleration
+    return Message( orientation=Message(x=x, y=y, z=z), linear_acceleration=Message(x=ax, y=ay, z=az) )
+
+
+def messagesFromLog(log):
+    ''' Time-ordered (time, kind, message) tuples of a recorder.FlightLog '''
+    messages = []
+    boxes = log.channel( 'tracker' )
+    for i in range( len(boxes['time']) ):
+        messages.append( (boxes['time'][i], 'tracker', boundingBox(int(boxes['seq'][i]), int(boxes['x'][i]), int(boxes['y'][i]),
+                                                                     int(boxes['width'][i]), int(boxes['height'][i]), boxes['confidence'][i])) )
+    nav = log.channel( 'navdata' )
+    for i in range( len(nav['time']) ):
+        messages.append( (nav['time'][i], 'navdata', navdata(nav['battery_percent'][i], nav['altitude'][i])) )
+    samples = log.channel( 'imu' )
+    for i in range( len(samples['time']) ):
+        messages.append( (samples['time'][i], 'imu', imu((samples['orientation_x'][i], samples['orientation_y'][i], samples['orientation_z'][i]),
+                                                         (samples['linear_acceleration_x'][i], samples['linear_acceleration_y'][i], samples['linear_acceleration_z'][i]))) )
+    messages.sort( key=lambda message: message[0] )
+    return messages
+
+
+def syntheticFlight(duration, tracker_rate=15.0, imu_rate=200.0, navdata_rate=15.0, size=(640, 360)):
+    ''' Time-ordered messages of a target circling around the center of the videofeed '''
+    width, height = size
+    messages = []
+    for i in range( int(duration * tracker_rate) ):
+        t = i / tracker_rate
+        x = width / 2 + 0.3 * width * math.cos( 0.5 * t ) - 20
+        y = height / 2 + 0.3 * height * math.sin( 0.5 * t ) - 20
+        scale = 1 + 0.3 * math.sin( 0.2 * t ) # Target moving closer and further away
+        messages.append( (t, 'tracker', boundingBox(i + 1, int(x), int(y), int(40 * scale), int(40 * scale), 0.9)) )
+    for i in range( int(duration * navdata_rate) ):
+        t = i / navdata_rate
+        messages.append( (t, 'navdata', navdata(80, 1000 + 100 * math.sin(0.3 * t))) )
+    for i in range( int(duration * imu_rate) ):
+        t = i / imu_rate
+        messages.append( (t, 'imu', imu((0.02 * math.sin(t), 0.02 * math.cos(t), 0.1))) )
+    messages.sort( key=lambda message: message[0] )
+    return messages
+
+
+class Replay():
+    ''' Drives a TrackingController with timestamped messages '''
+
+    def __init__(self, controller, control_rate=30, center_box=Box(288, 157, 64, 46), speed=0.2, imu_ring=None, frame_size=(640, 360), estimator=None):
+        ''' Constructor, center_box and speed as set in the interface, for frames of frame_size, estimator as kalman.TrackEstimator '''
+        self.controller = controller
+        self.estimator  = estimator
+        self.frame_size = frame_size
+        self.period     = 1.0 / control_rate
+        self.center_box = center_box
+        self.speed      = speed
+        self.imu        = imu_ring or ImuRing()
+        self.state      = StateStore( self.imu )
+
+    def run(self, messages):
+        ''' Replays the time-ordered (time, kind, message) tuples, returns the (time, Command) of every tick '''
+        commands = []
+        tick = None
+        for t, kind, message in messages:
+            if tick == None:
+                tick = t
+                self.controller.start( t, None )
+                if self.estimator != None:
+                    self.estimator.reset()
+            while tick < t: # Messages up to and including a tick are delivered before it
+                commands.append( (tick, self.step(tick)) )
+                tick += self.period
+            self.deliver( kind, message )
+        if tick != None:
+            commands.append( (tick, self.step(tick)) )
+        return commands
+
+    def step(self, tick):
+        ''' One control tick, returns its Command '''
+        snapshot = self.state.snapshot()
+        if self.estimator != None:
+            snapshot = self.estimator.estimate( snapshot, tick )
+        return self.controller.step( tick, snapshot, self.center_box, self.speed, self.frame_size )
+
+    def deliver(self, kind, message):
+        ''' Hands a message to the state, like the callback of its topic does '''
+        if kind == 'tracker':
+            self.state.tracker = trackerState( message )
+        elif kind == 'navdata':
+            self.state.navdata = navdataState( message )
+        elif kind == 'imu':
+            self.imu.append( message )
+        else:
+            raise ValueError( "Unknown message kind: %s" % kind )
@@ -0,0 +1,115 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       scheduler.py
+Description:    Fixed rate scheduler on a monotonic clock. Every task runs at
+                its own rate and the scheduler sleeps until the next task is
+                due, so the loops of the interface don't spin at 100% CPU.
+                Other threads can post a function to the loop, which wakes
+                it right away instead of waiting for the next due task.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import errno
+import fcntl
+import os
+import select
+import time
+from collections import deque
+
+try:
+    monotonic = time.monotonic
+except AttributeError:
+    # Python 2 has no monotonic clock in the time module, use clock_gettime
+    import ctypes
+    import ctypes.util
+
+    class _timespec(ctypes.Structure):
+        _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+    try:
+        _clock_gettime = ctypes.CDLL( ctypes.util.find_library('rt') or ctypes.util.find_library('c'), use_errno=True ).clock_gettime
+        _clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+    except (OSError, AttributeError, TypeError):
+        _clock_gettime = None
+
+    CLOCK_MONOTONIC = 1
+
+    def monotonic():
+        ''' Seconds of a clock that never goes backwards '''
+        if _clock_gettime == None:
+            return time.time()
+        t = _timespec()
+        if _clock_gettime( CLOCK_MONOTONIC, ctypes.byref(t) ) != 0:
+            error = ctypes.get_errno()
+            raise OSError( error, os.strerror(error) )
+        return t.tv_sec + t.tv_nsec * 1e-9
+
+
+class Task():
+    ''' Function that is called at a fixed rate '''
+    __slots__ = ('period', 'function', 'due')
+
+    def __init__(self, rate, function):
+        self.period   = 1.0 / rate
+        self.function = function
+        self.due      = monotonic()
+
+
+class Scheduler():
+    ''' Runs tasks at their own fixed rate and the functions posted to it
+
+    It waits in select() on a pipe, a post writes a byte to it. A timed
+    wait on a threading.Event would poll in steps of up to 50 ms on
+    Python 2.
+    '''
+
+    def __init__(self):
+        ''' Constructor of an empty scheduler '''
+        self.tasks  = []
+        self.posted = deque() # append() and popleft() are atomic
+        self.wakeup, self.waker = os.pipe()
+        for fd in ( self.wakeup, self.waker ):
+            fcntl.fcntl( fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK )
+
+    def add(self, rate, function):
+        ''' Calls function rate times per second '''
+        task = Task( rate, function )
+        self.tasks.append( task )
+        return task
+
+    def post(self, function):
+        ''' Calls function from the loop as soon as possible, can be called from any thread '''
+        self.posted.append( function )
+        try:
+            os.write( self.waker, b'x' )
+        except OSError as e:
+            if e.errno != errno.EAGAIN: # A full pipe wakes the loop as well
+                raise
+
+    def step(self):
+        ''' Runs the posted functions and the tasks that are due, then sleeps until the next task is due or a function is posted '''
+        while self.posted:
+            self.posted.popleft()()
+        for task in self.tasks:
+            now = monotonic()
+            if now >= task.due:
+                task.function()
+                task.due += task.period
+                if task.due < now: # Fell behind, skip the missed ticks instead of bursting
+                    task.due = now + task.period
+        delay = min( task.due for task in self.tasks ) - monotonic()
+        if delay > 0 and not self.posted:
+            if select.select( [self.wakeup], [], [], delay )[0]:
+                try:
+                    os.read( self.wakeup, 4096 ) # The posted functions run at the start of the next step
+                except OSError as e:
+                    if e.errno != errno.EAGAIN:
+                        raise
+
+    def run(self, done):
+        ''' Steps until done() returns True '''
+        while not done():
+            self.step()
@@ -0,0 +1,123 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       services.py
+Description:    Runs blocking calls, like ROS service calls, on a worker
+                thread. The results are handed back to the UI loop when it
+                polls, so a slow driver never freezes the interface or the
+                publishing of /cmd_vel. A call that times out is reported,
+                but it keeps its worker busy until it returns, so the jobs
+                behind it wait: give every driver its own Worker.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import threading
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+from scheduler import monotonic
+
+
+class ServiceTimeout(Exception):
+    ''' Raised for a call that didn't finish in time '''
+    pass
+
+
+class Job():
+    ''' Call that is executed by the Worker '''
+    __slots__ = ('function', 'callback', 'deadline', 'result', 'error')
+
+    def __init__(self, function, callback, deadline):
+        self.function = function
+        self.callback = callback
+        self.deadline = deadline
+        self.result   = None
+        self.error    = None
+
+
+class Worker():
+    ''' Background thread executing jobs one after the other '''
+
+    def __init__(self, name='worker'):
+        ''' Constructor, starts the thread '''
+        self.requests = queue.Queue()
+        self.finished = queue.Queue()
+        self.pending  = [] # Jobs not yet reported, only used by the UI loop
+        self.thread   = threading.Thread( target=self.__loop, name=name )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, function, callback=None, timeout=None):
+        ''' Runs function on the worker, callback(result, error) is called from poll() '''
+        job = Job( function, callback, None if timeout == None else monotonic() + timeout )
+        self.pending.append( job )
+        self.requests.put( job )
+        return job
+
+    def poll(self):
+        ''' Reports finished and timed out jobs, to be called from the UI loop.
+            A timed out job still occupies the thread until its function returns '''
+        while True:
+            try:
+                job = self.finished.get_nowait()
+            except queue.Empty:
+                break
+            if job in self.pending: # Not reported as timed out already
+                self.pending.remove( job )
+                self.__report( job )
+        now = monotonic()
+        for job in [ job for job in self.pending if job.deadline != None and now > job.deadline ]:
+            self.pending.remove( job )
+            job.error = ServiceTimeout( "no response within the timeout" )
+            self.__report( job )
+
+    def __report(self, job):
+        if job.callback != None:
+            job.callback( job.result, job.error )
+
+    def __loop(self):
+        while True:
+            job = self.requests.get()
+            try:
+                job.result = job.function()
+            except Exception as e:
+                job.error = e
+            self.finished.put( job )
+
+
+class AsyncService():
+    ''' Persistent service connection that is called through a Worker '''
+
+    def __init__(self, worker, connect, timeout=2.0):
+        ''' Constructor, connect() waits for the service and returns a callable proxy '''
+        self.worker  = worker
+        self.connect = connect
+        self.timeout = timeout
+        self.proxy   = None
+        self.job     = None # Call in progress
+
+    @property
+    def pending(self):
+        ''' True while a call is in progress '''
+        return self.job != None and self.job in self.worker.pending
+
+    def call(self, callback=None):
+        ''' Starts a call, returns False if the previous one is still in progress '''
+        if self.pending:
+            return False
+        def done(result, error):
+            if error != None:
+                self.proxy = None # Reconnect on the next call
+            if callback != None:
+                callback( result, error )
+        self.job = self.worker.submit( self.__call, done, self.timeout )
+        return True
+
+    def __call(self):
+        proxy = self.proxy
+        if proxy == None:
+            proxy = self.proxy = self.connect( self.timeout )
+        return proxy()
@@ -0,0 +1,67 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       state.py
+Description:    Latest-value store for the data of the ROS callbacks. Each
+                callback builds one immutable record and swaps it in with a
+                single attribute assignment, which is atomic, so the loops
+                read consistent records without taking a lock. The IMU data
+                is kept in a ring buffer instead, see imu.py.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+from collections import namedtuple
+
+
+class Box(namedtuple('Box', 'x y width height')):
+    ''' Rectangle in the videofeed, usable wherever pygame expects a rect '''
+    __slots__ = ()
+
+
+class TrackerState(namedtuple('TrackerState', 'box confidence seq secs nsecs')):
+    ''' Latest box of the tracker with the header it came with '''
+    __slots__ = ()
+
+
+class NavdataState(namedtuple('NavdataState', 'battery_percent altitude')):
+    ''' Latest navdata of the AR.Drone '''
+    __slots__ = ()
+
+
+class ImuState(namedtuple('ImuState', 'orientation_x orientation_y orientation_compass linear_acceleration_x linear_acceleration_y linear_acceleration_z')):
+    ''' Latest IMU data, orientation_x and orientation_y as factors from 0 - 1 '''
+    __slots__ = ()
+
+
+class Snapshot(namedtuple('Snapshot', 'tracker navdata imu')):
+    ''' The records of all callbacks at one moment '''
+    __slots__ = ()
+
+
+def trackerState(tracking_box):
+    ''' TrackerState of a tld_msgs/BoundingBox message '''
+    box = Box( tracking_box.x, tracking_box.y, tracking_box.width, tracking_box.height )
+    return TrackerState( box, tracking_box.confidence, tracking_box.header.seq,
+                         tracking_box.header.stamp.secs, tracking_box.header.stamp.nsecs )
+
+
+def navdataState(navdata):
+    ''' NavdataState of an ardrone_autonomy/Navdata message '''
+    return NavdataState( navdata.batteryPercent, navdata.altd )
+
+
+class StateStore(object):
+    ''' Holds the latest record of every callback '''
+    __slots__ = ('tracker', 'navdata', 'imu')
+
+    def __init__(self, imu):
+        ''' Constructor, imu is the ImuRing the IMU callback writes into '''
+        self.tracker = None
+        self.navdata = NavdataState( None, None )
+        self.imu     = imu
+
+    def snapshot(self):
+        ''' The current records, to be read once per tick. The IMU record is computed here '''
+        return Snapshot( self.tracker, self.navdata, self.imu.state() )
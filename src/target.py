@@ -0,0 +1,138 @@
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       target.py
+Description:    Publishing of the selected tracking target on /tld_gui_bb.
+                The tld_msgs/Target carries the full frame, a crop around
+                the box (which tld_tracker can't place in the frame yet) or
+                only a reference to the frame by its header. The
+                message is built and published on a background thread and
+                only the latest selection is sent, so selecting targets
+                quickly doesn't stall the UI loop or flood the network.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import copy
+import threading
+import pygame
+from sensor_msgs.msg import Image
+from tld_msgs.msg import Target
+from compressed import DecodedFrame
+
+PAYLOADS = ('full', 'roi', 'reference')
+
+
+def roiRect(box, size, margin):
+    ''' pygame.Rect around box, grown by margin times its size on every side and clipped to size '''
+    rect = pygame.Rect( box ).inflate( 2 * int(margin * box[2]), 2 * int(margin * box[3]) )
+    return rect.clip( pygame.Rect((0, 0), size) )
+
+
+def rawImage(frame):
+    ''' sensor_msgs/Image with the pixels of a DecodedFrame, to be called from the thread that draws it '''
+    image          = Image()
+    image.header   = frame.header
+    image.width    = frame.width
+    image.height   = frame.height
+    image.encoding = 'rgb8'
+    image.is_bigendian = 0
+    image.step     = frame.width * 3
+    with frame.lock: # The compositor may be drawing it
+        image.data = pygame.image.tostring( frame.surface, 'RGB' )
+    return image
+
+
+def cropImage(image, rect):
+    ''' sensor_msgs/Image of the rect region of a sensor_msgs/Image '''
+    crop          = Image()
+    crop.header   = image.header
+    crop.width    = rect.width
+    crop.height   = rect.height
+    pixel         = image.step // image.width
+    crop.encoding = image.encoding
+    crop.is_bigendian = image.is_bigendian
+    crop.step     = rect.width * pixel
+    crop.data     = b''.join( image.data[row * image.step + rect.x * pixel:row * image.step + rect.right * pixel]
+                              for row in range(rect.y, rect.bottom) )
+    return crop
+
+
+def targetMessage(image, box, payload='full', margin=0.5):
+    ''' tld_msgs/Target of box, in frame coordinates, selected in image
+
+    full sends the image itself, without copying it. roi sends the crop
+    around the box, the box is relative to the crop and the header frame_id
+    of the image gets the offset of the crop appended as "@x,y". tld_tracker
+    doesn't parse that offset, roi needs a tracker that does. reference sends
+    only the header and size of the frame, for a tracker that keeps the
+    frames it received itself.
+    '''
+    if payload not in PAYLOADS:
+        raise ValueError( "Unknown target payload: %s" % payload )
+    target = Target()
+    target.bb.x          = box[0]
+    target.bb.y          = box[1]
+    target.bb.width      = box[2]
+    target.bb.height     = box[3]
+    target.bb.confidence = 1.0
+    if payload == 'reference':
+        target.img.header   = image.header
+        target.img.width    = image.width
+        target.img.height   = image.height
+        target.img.encoding = getattr( image, 'encoding', 'rgb8' )
+        return target
+    if payload == 'full':
+        target.img = image
+        return target
+    rect = roiRect( box, (image.width, image.height), margin )
+    target.bb.x -= rect.x
+    target.bb.y -= rect.y
+    target.img = cropImage( image, rect )
+    target.img.header = copy.copy( image.header ) # The frame itself may still be drawn
+    target.img.header.frame_id = "%s@%d,%d" % ( image.header.frame_id, rect.x, rect.y )
+    return target
+
+
+class TargetPublisher():
+    ''' Publishes the latest selected target from a background thread '''
+
+    def __init__(self, publisher, payload='full', margin=0.5):
+        ''' Constructor, publisher of /tld_gui_bb, payload and margin as in targetMessage '''
+        if payload not in PAYLOADS:
+            raise ValueError( "Unknown target payload: %s" % payload )
+        self.publisher = publisher
+        self.payload   = payload
+        self.margin    = margin
+        self.latest    = None # (image, box) not yet published
+        self.sent      = 0
+        self.replaced  = 0 # Selections replaced by a newer one before they were sent
+        self.condition = threading.Condition()
+        self.thread    = threading.Thread( target=self.__loop, name='target' )
+        self.thread.daemon = True
+        self.thread.start()
+
+    def send(self, image, box):
+        ''' Queues the target box selected in image, replaces a target that wasn't sent yet.
+            To be called from the UI loop, the surface of a DecodedFrame is copied here and never read by the thread '''
+        if isinstance( image, DecodedFrame ) and self.payload != 'reference':
+            image = rawImage( image )
+        with self.condition:
+            if self.latest != None:
+                self.replaced += 1
+            self.latest = ( image, tuple(box) )
+            self.condition.notify()
+
+    def __loop(self):
+        while True:
+            with self.condition:
+                while self.latest == None:
+                    self.condition.wait()
+                image, box  = self.latest
+                self.latest = None
+            try:
+                self.publisher.publish( targetMessage(image, box, self.payload, self.margin) )
+                self.sent += 1
+            except Exception as e:
+                print( "Sending target failed: %s" % e )
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       test_bindings.py
+Description:    Tests of the key bindings read from YAML, which turns some
+                unquoted keys into numbers or booleans.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+import unittest
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+import pygame
+import yaml
+from bindings import DEFAULT_BINDINGS, KeyDispatcher, keyCode, mergeBindings
+
+
+class TestBindings(unittest.TestCase):
+
+    def actions(self):
+        names = set( action for keys in DEFAULT_BINDINGS.values() for action in keys.values() if action )
+        return dict( (name, (lambda: None, None)) for name in names )
+
+    def test_number_key(self):
+        merged = mergeBindings( DEFAULT_BINDINGS, yaml.safe_load("manual:\n  1: takeoff_land\n") )
+        self.assertEqual( merged['manual']['1'], 'takeoff_land' )
+        dispatcher = KeyDispatcher( self.actions(), merged )
+        self.assertTrue( dispatcher.press('manual', keyCode('1')) )
+
+    def test_quoted_boolean_key(self):
+        merged = mergeBindings( DEFAULT_BINDINGS, yaml.safe_load("manual:\n  'y': takeoff_land\n  'n': ''\n") )
+        self.assertEqual( merged['manual']['y'], 'takeoff_land' )
+        dispatcher = KeyDispatcher( self.actions(), merged )
+        self.assertTrue( dispatcher.press('manual', pygame.K_y) )
+        self.assertFalse( dispatcher.press('manual', pygame.K_n) )
+
+    def test_boolean_key_rejected(self):
+        for key in ('yes', 'no', 'on', 'off', 'true'):
+            overrides = yaml.safe_load( "manual:\n  %s: takeoff_land\n" % key )
+            with self.assertRaises( ValueError ) as raised:
+                mergeBindings( DEFAULT_BINDINGS, overrides )
+            self.assertTrue( 'quote' in str(raised.exception) )
+
+    def test_unknown_key(self):
+        with self.assertRaises( ValueError ):
+            KeyDispatcher( self.actions(), mergeBindings(DEFAULT_BINDINGS, {'manual': {'nokey': 'takeoff_land'}}) )
+
+
+if __name__ == '__main__':
+    unittest.main()
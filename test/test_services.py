@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+'''
+############### NLR: AR.Drone Keyboard Interface ###############
+
+Filename:       test_services.py
+Description:    Tests of the service calls on a Worker. Every drone has its
+                own Worker, so a driver whose service hangs doesn't hold up
+                the service calls of the other drones.
+
+############### NLR: AR.Drone Keyboard Interface ###############
+'''
+
+# Libraries
+import os
+import sys
+import time
+import threading
+import unittest
+sys.path.insert( 0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src') )
+from services import Worker, AsyncService, ServiceTimeout
+
+
+def pollUntil(workers, done, timeout=2.0):
+    ''' Polls workers like the event tick until done() or timeout seconds passed '''
+    deadline = time.time() + timeout
+    while not done() and time.time() < deadline:
+        for worker in workers:
+            worker.poll()
+        time.sleep( 0.01 )
+
+
+class TestServices(unittest.TestCase):
+
+    def setUp(self):
+        self.release = threading.Event() # Lets the hanging service answer
+
+    def tearDown(self):
+        self.release.set()
+
+    def connectHanging(self, timeout):
+        return lambda: self.release.wait( 5.0 )
+
+    def connectAnswering(self, timeout):
+        return lambda: 'toggled'
+
+    def test_hanging_drone_does_not_block_other_drone(self):
+        hanging, answering = Worker( 'services drone1' ), Worker( 'services drone2' )
+        service_hanging    = AsyncService( hanging, self.connectHanging, 5.0 )
+        service_answering  = AsyncService( answering, self.connectAnswering, 5.0 )
+        results = []
+        self.assertTrue( service_hanging.call(lambda result, error: results.append(('drone1', result, error))) )
+        self.assertTrue( service_answering.call(lambda result, error: results.append(('drone2', result, error))) )
+        pollUntil( [hanging, answering], lambda: results )
+        self.assertEqual( results, [('drone2', 'toggled', None)] )
+        self.assertTrue( service_hanging.pending )
+        self.assertFalse( service_answering.pending )
+
+    def test_timed_out_call_keeps_its_worker_busy(self):
+        worker  = Worker( 'services drone1' )
+        service = AsyncService( worker, self.connectHanging, 0.1 )
+        results = []
+        service.call( lambda result, error: results.append(error) )
+        pollUntil( [worker], lambda: results )
+        self.assertEqual( len(results), 1 )
+        self.assertTrue( isinstance(results[0], ServiceTimeout) )
+
+        # The next job of the same worker waits until the hanging call returns
+        later = []
+        worker.submit( lambda: 'done', lambda result, error: later.append(result) )
+        pollUntil( [worker], lambda: later, 0.3 )
+        self.assertEqual( later, [] )
+        self.release.set()
+        pollUntil( [worker], lambda: later )
+        self.assertEqual( later, ['done'] )
+
+    def test_call_refused_while_pending(self):
+        worker  = Worker( 'services drone1' )
+        service = AsyncService( worker, self.connectHanging, 5.0 )
+        self.assertTrue( service.call() )
+        self.assertFalse( service.call() )
+        self.release.set()
+        pollUntil( [worker], lambda: not service.pending )
+        self.assertTrue( service.call() )
+
+
+if __name__ == '__main__':
+    unittest.main()